@@ -27,6 +27,7 @@
     'data': [
         'security/ir.model.access.csv',
         'data/gdi_rental_sequence.xml',
+        'data/gdi_rental_cron.xml',
         # 'data/gdi_rental_picking_type.xml',
         'report/rental_quotation_templates.xml',
         'report/rental_picking_list.xml',
@@ -34,11 +35,16 @@
         'report/rental_reports.xml',
         'wizard/views/rental_contract_creation_wizard_views.xml',
         'wizard/views/rental_item_hireoff_wizard_views.xml',
+        'wizard/views/rental_bulk_hireoff_wizard_views.xml',
         'views/product_views.xml',
+        'views/stock_warehouse_views.xml',
         'views/rental_quotation_views.xml',
         'views/rental_order_views.xml',
         'views/rental_contract_views.xml',
         'views/rental_delivery_order_views.xml',
+        'views/rental_utilization_report_views.xml',
+        'views/rental_report_job_views.xml',
+        'views/rental_expiry_scan_log_views.xml',
         'views/menu_views.xml',
     ],
     'license': 'LGPL-3',
@@ -1,5 +1,19 @@
 # -*- coding: utf-8 -*-
 
+from . import account_move
+from . import account_tax
+from . import ir_actions_report
+from . import ir_config_parameter
+from . import product
+from . import stock_warehouse
+from . import rental_period_mixin
+from . import rental_stock_availability
+from . import rental_occupancy_ledger
+from . import rental_lot_allocation
+from . import rental_lot_ledger
+from . import rental_expiry_scanner
+from . import rental_utilization_report
+from . import rental_report_job
 from . import rental_quotation
 from . import rental_quotation_line
 from . import rental_order
@@ -0,0 +1,9 @@
+# -*- coding: utf-8 -*-
+
+from odoo import fields, models
+
+
+class AccountMove(models.Model):
+    _inherit = "account.move"
+
+    rental_contract_id = fields.Many2one("rental.contract", string="Rental Contract", readonly=True, copy=False, index=True)
@@ -0,0 +1,38 @@
+# -*- coding: utf-8 -*-
+
+from odoo import models
+
+# Tax types whose amount only depends on the price, the quantity and the currency.
+PLAIN_TAX_TYPES = ('percent', 'division', 'fixed', 'group')
+
+
+class AccountTax(models.Model):
+    _inherit = "account.tax"
+
+    def _rental_compute_all(self, memo, price_unit, currency=None, quantity=1.0, product=None, partner=None):
+        """
+        Memoized ``compute_all`` for line amount computes. Lines sharing the same
+        taxes, price, quantity and currency are computed only once; product and
+        partner are part of the key only when a tax may depend on them.
+
+        Args:
+            memo: dict shared by the lines of one compute batch
+            price_unit, currency, quantity, product, partner: see ``compute_all``
+
+        Returns:
+            dict: ``compute_all`` result, must not be modified by the caller
+        """
+        tax_key = tuple(self.ids)
+        plain = memo.get(('plain', tax_key))
+        if plain is None:
+            plain = all(tax.amount_type in PLAIN_TAX_TYPES for tax in self.flatten_taxes_hierarchy())
+            memo[('plain', tax_key)] = plain
+
+        key = (
+            tax_key, price_unit, currency.id if currency else None, quantity,
+            None if plain else (product.id if product else None),
+            None if plain else (partner.id if partner else None),
+        )
+        if key not in memo:
+            memo[key] = self.compute_all(price_unit, currency, quantity, product=product, partner=partner)
+        return memo[key]
@@ -0,0 +1,34 @@
+# -*- coding: utf-8 -*-
+
+import time
+
+from odoo import models
+from odoo.tools.safe_eval import safe_eval
+
+from .rental_delivery_order import RENTAL_REPORT_CACHE_PREFIX
+
+# Rental reports of large pickings are rendered by the rental.report.job queue.
+RENTAL_QUEUED_REPORTS = ('gdi_rental.report_rental_picking_list', 'gdi_rental.report_rental_delivery_order')
+
+
+class IrActionsReport(models.Model):
+    _inherit = "ir.actions.report"
+
+    def report_action(self, docids, data=None, config=True):
+        if self.report_name in RENTAL_QUEUED_REPORTS and not data:
+            if isinstance(docids, models.BaseModel):
+                records = docids
+            else:
+                records = self.env[self.model].browse([docids] if isinstance(docids, int) else docids or [])
+            if records and records._rental_report_needs_queue(self):
+                return self.env['rental.report.job']._enqueue(self, records)
+        return super(IrActionsReport, self).report_action(docids, data=data, config=config)
+
+    def _postprocess_pdf_report(self, record, buffer):
+        result = super(IrActionsReport, self)._postprocess_pdf_report(record, buffer)
+        # A new cached rental PDF supersedes the ones rendered before the last change.
+        if record._name == 'stock.picking' and self.attachment_use and self.attachment:
+            attachment_name = safe_eval(self.attachment, {'object': record, 'time': time})
+            if attachment_name and attachment_name.startswith(RENTAL_REPORT_CACHE_PREFIX):
+                record._clean_rental_report_cache(attachment_name)
+        return result
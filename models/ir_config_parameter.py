@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, models
+
+
+class IrConfigParameter(models.Model):
+    _inherit = "ir.config_parameter"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        records = super(IrConfigParameter, self).create(vals_list)
+        records._sync_rental_report_workers()
+        return records
+
+    def write(self, vals):
+        res = super(IrConfigParameter, self).write(vals)
+        self._sync_rental_report_workers()
+        return res
+
+    def unlink(self):
+        # Removing the parameter falls back to the default concurrency.
+        concurrency_params = self.filtered(lambda param: param.key == 'gdi_rental.report_job_concurrency')
+        res = super(IrConfigParameter, self).unlink()
+        if concurrency_params:
+            self.env['rental.report.job']._sync_worker_crons()
+        return res
+
+    def _sync_rental_report_workers(self):
+        """Create or archive the report queue workers when their concurrency changes."""
+        if 'gdi_rental.report_job_concurrency' in self.mapped('key'):
+            self.env['rental.report.job']._sync_worker_crons()
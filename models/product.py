@@ -0,0 +1,56 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, models, tools
+
+
+class RentalPricing(models.Model):
+    _inherit = "rental.pricing"
+
+    # Every pricing change, from the product form (one2many commands), the
+    # pricing list or imports, drops the cached rental pricing tables in every worker.
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super(RentalPricing, self).create(vals_list)
+        self.env['product.product'].clear_caches()
+        return res
+
+    def write(self, vals):
+        res = super(RentalPricing, self).write(vals)
+        self.env['product.product'].clear_caches()
+        return res
+
+    def unlink(self):
+        res = super(RentalPricing, self).unlink()
+        self.env['product.product'].clear_caches()
+        return res
+
+
+class ProductProduct(models.Model):
+    _inherit = "product.product"
+
+    @api.model
+    @tools.ormcache('product_id')
+    def _get_rental_pricing_table(self, product_id):
+        """
+        Read the rental pricing of a product once and keep it in the registry cache.
+
+        Args:
+            product_id: product.product id
+
+        Returns:
+            tuple: ((unit, price), ...) pairs, empty when no rental pricing is configured
+        """
+        product = self.browse(product_id).sudo()
+        return tuple((price.unit, price.price) for price in product.rental_pricing_ids)
+
+    def _get_rental_pricing_list(self):
+        """
+        Get the rental price of the product per duration unit.
+
+        Returns:
+            dict: {unit: price}, or False when no rental pricing is configured
+        """
+        if len(self) != 1:
+            return False
+        pricing_table = self._get_rental_pricing_table(self.id)
+        return dict(pricing_table) if pricing_table else False
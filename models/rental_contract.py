@@ -1,18 +1,25 @@
 # -*- coding: utf-8 -*-
 
 import logging
+import time
+
+import psycopg2
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
-from dateutil.relativedelta import relativedelta
+from odoo.tools import split_every
 import datetime
 
 _logger = logging.getLogger(__name__)
 
+# Number of contracts invoiced per batched account.move creation.
+INVOICE_BATCH_SIZE = 50
+
 
 class RentalContract(models.Model):
     _name = "rental.contract"
-    _inherit = ["mail.thread", "mail.activity.mixin"]
+    _inherit = ["mail.thread", "mail.activity.mixin", "rental.period.mixin"]
+    _rental_line_field = "contract_line_ids"
     _description = "Rental Contract"
 
     order_id = fields.Many2one('gdi.rental.order', string='RO Reference', required=True,
@@ -22,6 +29,8 @@ class RentalContract(models.Model):
     customer_po_number = fields.Char(string="Customer Ref. PO", copy=False)
     start_date = fields.Date(string="Start Date", required=False)
     end_date = fields.Date(string="End Date", compute="_compute_end_date", store=True)
+    expiry_notified_date = fields.Date(string="Expiry Notified For", readonly=True, copy=False,
+                                       help="End date the expiry activity was scheduled for.")
 
     duration = fields.Integer(string="Duration", default=1, required=True, compute="_compute_duration_from_lines", inverse="_inverse_duration", store=True)
     duration_unit = fields.Selection([
@@ -58,6 +67,8 @@ class RentalContract(models.Model):
             self.env.ref("sales_team.group_sale_salesman").id
         ),)
     contract_line_ids = fields.One2many("rental.contract.line", "contract_id", string="Rental Items")
+    invoice_ids = fields.One2many("account.move", "rental_contract_id", string="Invoices", readonly=True)
+    invoice_count = fields.Integer(string="Invoice Count", compute="_compute_invoice_count")
 
     fiscal_position_id = fields.Many2one(
         'account.fiscal.position', string='Fiscal Position',
@@ -82,37 +93,6 @@ class RentalContract(models.Model):
         ], limit=1)
     )
     
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                # For hours, we need to handle it differently as Date fields don't have hours
-                # This is a simplified approach - you might need to convert to datetime if precision is critical
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-
-    @api.model
-    def _convert_to_days(self, duration, duration_unit):
-        """Convert any duration unit to approximate days for comparison"""
-        if duration_unit == 'hour':
-            return duration / 24
-        elif duration_unit == 'day':
-            return duration
-        elif duration_unit == 'week':
-            return duration * 7
-        elif duration_unit == 'month':
-            return duration * 30  # Approximation
-        return 0
-    
     # @api.onchange('duration', 'duration_unit')
     # def _onchange_header_duration(self):
     #     """Update all line durations when header duration changes"""
@@ -121,30 +101,12 @@ class RentalContract(models.Model):
     #             line.duration = self.duration
     #             line.duration_unit = self.duration_unit
 
-    @api.depends("contract_line_ids", "contract_line_ids.duration", "contract_line_ids.duration_unit")
-    def _compute_duration_from_lines(self):
-        for record in self:
-            record.update_header_duration()
-
-    def _inverse_duration(self):
-        # Just allow the fields to be editable.
-        pass    
-    
-    def update_header_duration(self):
-        """Update header duration based on longest line item"""
-        longest_days = 0
-        longest_duration = self.duration
-        longest_unit = self.duration_unit
-        
-        for line in self.contract_line_ids:
-            line_days = self._convert_to_days(line.duration, line.duration_unit)
-            if line_days > longest_days:
-                longest_days = line_days
-                longest_duration = line.duration
-                longest_unit = line.duration_unit
-        
-        self.duration = longest_duration
-        self.duration_unit = longest_unit
+    def init(self):
+        # Partial index used by the expiry scanner on signed contracts.
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_contract_signed_end_date_idx
+            ON rental_contract (end_date) WHERE state = 'signed'
+        """)
 
     @api.model
     def create(self, vals):
@@ -188,15 +150,15 @@ class RentalContract(models.Model):
         if not self:
             return self.env['stock.picking']
         
-        picking_type_id = self.env["stock.picking.type"].search([(
-            'name', '=', 'Rental Physical Inventory'
-        )])
-        if not picking_type_id:
-            raise ValidationError("Operation type not found. Please contact your system administrator !")
-
         created_pickings = self.env['stock.picking']
         
         for contract in self:
+            picking_type_id = self.env['stock.warehouse']._get_rental_picking_type(
+                'inventory', company=contract.company_id, warehouse=contract.warehouse_id
+            )
+            if not picking_type_id:
+                raise ValidationError("Operation type not found. Please contact your system administrator !")
+
             # try:
             if not self._context.get('new_rdo'):
                 self._create_physical_inventory(picking_type_id)
@@ -226,7 +188,7 @@ class RentalContract(models.Model):
         Returns:
             stock.picking: Created picking record
         """
-        picking_type = self._get_picking_type()
+        picking_type = contract._get_picking_type()
         if not picking_type:
             raise UserError(_("No suitable picking type found for rental delivery orders"))
         
@@ -241,16 +203,9 @@ class RentalContract(models.Model):
 
     def _get_picking_type(self):
         """Get the appropriate picking type for rental deliveries."""
-        PickingType = self.env['stock.picking.type']
-        
-        # Try rental-specific picking type first
-        picking_type = PickingType.search([('name', '=', 'Rental Delivery Orders')], limit=1)
-        
-        if not picking_type:
-            # Fallback to general delivery orders
-            picking_type = PickingType.search([('name', '=', 'Delivery Orders')], limit=1)
-        
-        return picking_type
+        return self.env['stock.warehouse']._get_rental_picking_type(
+            'delivery', company=self[:1].company_id, warehouse=self[:1].warehouse_id
+        )
 
     def _prepare_picking_vals(self, contract, picking_type):
         """
@@ -327,39 +282,49 @@ class RentalContract(models.Model):
 
     def _create_stock_moves(self, contract, picking, picking_type):
         """
-        Create stock moves for rental items.
+        Create stock moves for rental items with a single create call.
         
         Args:
             contract: rental contract record
             picking: stock.picking record
             picking_type: stock.picking.type record
+
+        Returns:
+            stock.move: Created stock moves
         """
         current_datetime = fields.Datetime.now()
+        move_vals_list = []
+        ro_lines = self.env['gdi.rental.order.line']
         
         for rental_item in picking.rental_order_item_ids:
             contract_line = rental_item.contract_line_id
             
             if contract_line.item_type != 'set':
-                # Create single move for non-set items
-                self._create_stock_move(
+                # Prepare single move for non-set items
+                move_vals_list.append(self._prepare_stock_move_vals(
                     contract_line, contract, picking, picking_type, 
                     rental_item, current_datetime
-                )
+                ))
             else:
-                # Create moves for set components
-                self._create_set_component_moves(
+                # Prepare moves for set components
+                move_vals_list.extend(self._prepare_set_component_move_vals(
                     contract_line, contract, picking, picking_type, 
                     rental_item, current_datetime
-                )
+                ))
             
-            # Update rental order line state
-            if contract_line.ro_line_id:
-                contract_line.ro_line_id.write({'rental_state': 'active'})
+            ro_lines |= contract_line.ro_line_id
+
+        moves = self.env["stock.move"].create(move_vals_list)
 
-    def _create_stock_move(self, contract_line, contract, picking, picking_type, 
-                        rental_item, current_datetime, component=None):
+        # Update rental order lines state
+        if ro_lines:
+            ro_lines.write({'rental_state': 'active'})
+        return moves
+
+    def _prepare_stock_move_vals(self, contract_line, contract, picking, picking_type, 
+                                 rental_item, current_datetime, component=None):
         """
-        Create a single stock move.
+        Prepare values for a single stock move.
         
         Args:
             contract_line: contract line record
@@ -369,6 +334,9 @@ class RentalContract(models.Model):
             rental_item: rental order item record
             current_datetime: current datetime
             component: component record (for set items)
+
+        Returns:
+            dict: Values for stock.move creation
         """
         if component:
             # For set components
@@ -385,7 +353,7 @@ class RentalContract(models.Model):
             qty = contract_line.product_uom_qty or 1.0
             uom = contract_line.product_uom
         
-        move_vals = {
+        return {
             'sequence_number': contract_line.sequence or 0,
             'name': name,
             'description_picking': name,
@@ -402,12 +370,10 @@ class RentalContract(models.Model):
             'rental_order_component_id': component.id if component else False
         }
 
-        return self.env["stock.move"].create(move_vals)
-
-    def _create_set_component_moves(self, contract_line, contract, picking, 
-                                picking_type, rental_item, current_datetime):
+    def _prepare_set_component_move_vals(self, contract_line, contract, picking, 
+                                         picking_type, rental_item, current_datetime):
         """
-        Create stock moves for set components.
+        Prepare stock move values for set components.
         
         Args:
             contract_line: contract line record
@@ -416,13 +382,17 @@ class RentalContract(models.Model):
             picking_type: stock.picking.type record
             rental_item: rental order item record
             current_datetime: current datetime
+
+        Returns:
+            list: List of dict values for stock.move creation
         """
-        ro_line_component_ids = contract_line.ro_line_id.component_line_ids
-        for component in ro_line_component_ids:
-            self._create_stock_move(
+        return [
+            self._prepare_stock_move_vals(
                 contract_line, contract, picking, picking_type,
                 rental_item, current_datetime, component=component
             )
+            for component in contract_line.ro_line_id.component_line_ids
+        ]
 
     def _create_physical_inventory(self, picking_type_id):
         """
@@ -502,265 +472,163 @@ class RentalContract(models.Model):
         Returns:
             list: List of tuples for creating stock moves
         """
-        current_datetime = fields.Datetime.now()
-        move_lines = []
-        sq_no = 0
-        
-        for line in self.contract_line_ids:
-            sq_no += 1 
+        return self.contract_line_ids.ro_line_id._prepare_return_moves_vals(picking_type_id)
 
-            prev_picking = self._get_previous_picking(line)
-            if not prev_picking:
-                _logger.warning(f"No previous picking found for rental extend line: {line.name}")
-                continue
+    def _compute_invoice_count(self):
+        invoice_data = self.env['account.move'].read_group(
+            [('rental_contract_id', 'in', self.ids)], ['rental_contract_id'], ['rental_contract_id']
+        )
+        counts = {data['rental_contract_id'][0]: data['rental_contract_id_count'] for data in invoice_data}
+        for contract in self:
+            contract.invoice_count = counts.get(contract.id, 0)
 
-            if line.item_type == 'set' and line.component_line_ids:
-                # Handle set items with components
-                component_moves = self._prepare_return_set_component_moves(
-                    line, picking_type_id, prev_picking,
-                    sq_no, current_datetime
-                )
-                move_lines.extend(component_moves)
-            else:
-                # Handle regular unit items
-                move_data = self._prepare_return_stock_move(
-                    line, picking_type_id, prev_picking, 
-                    sq_no, current_datetime
-                )
-                if move_data:
-                    move_lines.append(move_data)
-        
-        return move_lines
-    
-    def _get_previous_picking(self, line):
-        """
-        Get the previous picking/move for a rental line.
-        
-        Args:
-            line: rental extension line record
-            
-        Returns:
-            stock.move: Previous stock move or False
-        """
-        if not line.ro_line_id or not line.ro_line_id.stock_move_ids:
-            return False
-        
-        moves = line.ro_line_id.stock_move_ids
-        return moves[-1] if moves else False
-    
-    def _prepare_return_set_component_moves(self, line, picking_type_id,
-                                           prev_picking, sequence, current_datetime):
-        """
-        Prepare return move data for all components in a set.
-        
-        Args:
-            line: rental extension line record (set item)
-            picking_type_id: stock.picking.type record
-            prev_picking: previous stock.move record
-            sequence: base sequence number for the set
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating component moves
+    @api.model
+    def _get_contracts_to_invoice(self, billing_date):
         """
-        component_moves = []
-        component_seq = 0
-        
-        for component in line.component_line_ids:
-            component_seq += 1
-
-            prev_component_move = self._find_component_previous_move(
-                component, prev_picking
-            )
+        Get the signed contracts having at least one line with a billing period
+        over on ``billing_date``. The selection is a superset, the exact periods
+        are resolved per line by ``_get_due_billing_periods``.
 
-            if not prev_component_move:
-                _logger.warning(
-                    f"No previous move found for component {component.product_id.name} "
-                    f"in set {line.name}"
-                )
-                continue
-
-            move_data = self._prepare_return_component_move(
-                line, component, picking_type_id,
-                prev_component_move, sequence, component_seq, current_datetime
-            )
-            
-            if move_data:
-                component_moves.append(move_data)
-        
-        return component_moves
-
-    def _find_component_previous_move(self, component, prev_picking):
-        """
-        Find the previous stock move for a specific component.
-        
-        Args:
-            component: component line record
-            prev_picking: previous stock.move or stock.picking record
-            
         Returns:
-            stock.move: Previous move for this component or False
-        """
-        # If prev_picking is a stock.move, get its picking
-        if prev_picking._name == 'stock.move':
-            picking = prev_picking.picking_id
-        else:
-            picking = prev_picking
-        
-        if not picking:
-            return False
-        
-        # Search for move with matching product
-        component_move = picking.move_lines.filtered(
-            lambda m: m.product_id.id == component.product_id.id
-        )
-        
-        return component_move[0] if component_move else False
+            rental.contract: Contracts to invoice, ordered by id
+        """
+        self.flush(['state'])
+        self.env['rental.contract.line'].flush(['contract_id', 'start_date', 'end_date', 'billed_through_date'])
+        self._cr.execute("""
+            SELECT DISTINCT line.contract_id
+            FROM rental_contract_line AS line
+            JOIN rental_contract AS contract ON contract.id = line.contract_id
+            WHERE contract.state = 'signed' AND line.start_date IS NOT NULL AND
+                  COALESCE(line.billed_through_date, line.start_date) < COALESCE(line.end_date, 'infinity'::date) AND
+                  LEAST((COALESCE(line.billed_through_date, line.start_date) + interval '1 month')::date,
+                        line.end_date) <= %s
+            ORDER BY line.contract_id
+        """, (billing_date, ))
+        return self.browse([row[0] for row in self._cr.fetchall()])
+
+    def _prepare_invoice_vals(self, billing_date):
+        """
+        Prepare the invoice billing every due period of the contract lines.
 
-    def _prepare_return_component_move(self, set_line, component, 
-                                    picking_type_id, prev_component_move,
-                                    set_sequence, component_sequence, current_datetime):
-        """
-        Prepare return stock move data for a single set component.
-        
         Args:
-            set_line: rental extension line record (parent set)
-            component: component line record
-            picking_type_id: stock.picking.type record
-            prev_component_move: previous stock.move for this component
-            set_sequence: sequence number of the parent set
-            component_sequence: sequence number within components
-            current_datetime: current datetime
-            
+            billing_date: periods ending after this day are not billed
+
         Returns:
-            tuple: Move data tuple (0, 0, dict) for creation
+            tuple: (dict values for account.move creation or False when nothing is due,
+                    dict {contract line id: new billed through date})
         """
-        # Prepare move lines with lot tracking for the component
-        move_line_vals = self._prepare_component_return_move_lines(
-            component, prev_component_move, picking_type_id, current_datetime
-        )
-        
-        # Use component details for the move
-        product = component.product_id
-        name = product.product_name or product.name or component.name
-        
-        # Prepare main move values
-        move_vals = {
-            'sequence_number': set_sequence + (component_sequence * 0.01),  # e.g., 1.01, 1.02
-            'name': f"{set_line.name} - {name}",
-            'description_picking': name,
-            'product_id': product.id,
-            'product_uom': component.product_uom.id,
-            'product_uom_qty': component.product_uom_qty,
-            'date': current_datetime,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': prev_component_move.location_id.id,
-            'move_line_ids': move_line_vals,
+        self.ensure_one()
+        invoice_line_vals = []
+        billed_through = {}
+        for line in self.contract_line_ids:
+            for date_from, date_to in line._get_due_billing_periods(billing_date):
+                invoice_line_vals.append((0, 0, line._prepare_invoice_line_vals(date_from, date_to)))
+                billed_through[line.id] = date_to
+        if not invoice_line_vals:
+            return False, billed_through
+
+        invoice_vals = {
+            'move_type': 'out_invoice',
+            'partner_id': self.partner_id.address_get(['invoice'])['invoice'],
+            'partner_shipping_id': self.partner_id.id,
+            'currency_id': self.currency_id.id,
+            'fiscal_position_id': self.fiscal_position_id.id or False,
+            'invoice_user_id': self.user_id.id,
+            'invoice_origin': self.name,
+            'ref': self.customer_po_number or False,
+            'company_id': self.company_id.id,
+            'rental_contract_id': self.id,
+            'invoice_line_ids': invoice_line_vals,
         }
-        
-        return (0, 0, move_vals)
+        return invoice_vals, billed_through
 
-    def _prepare_component_return_move_lines(self, component, prev_component_move,
-                                            picking_type_id, current_datetime):
-        """
-        Prepare detailed move lines for component returns with lot/serial tracking.
-        
-        Args:
-            component: component line record
-            prev_component_move: previous stock.move record for this component
-            picking_type_id: stock.picking.type record
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating stock.move.line records
+    def _create_invoices(self, billing_date):
         """
-        move_lines = []
-        
-        if not prev_component_move.move_line_ids:
-            return move_lines
-        
-        for moveline in prev_component_move.move_line_ids:
-            move_line_vals = {
-                'product_id': component.product_id.id,
-                'product_uom_id': component.product_uom.id,
-                'product_uom_qty': moveline.qty_done,
-                'qty_done': moveline.qty_done,
-                'date': current_datetime,
-                'location_id': picking_type_id.default_location_dest_id.id,
-                'location_dest_id': prev_component_move.location_id.id,
-                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
-            }
-            move_lines.append((0, 0, move_line_vals))
-        
-        return move_lines
+        Invoice the due periods of the contracts with one account.move creation
+        per company, then move the billed through date of the invoiced lines.
 
-    def _prepare_return_stock_move(self, line, picking_type_id, 
-                                prev_picking, sequence, current_datetime):
-        """
-        Prepare return stock move data with detailed move lines.
-        (For non-set items)
-        
         Args:
-            line: rental extension line record
-            picking_type_id: stock.picking.type record
-            prev_picking: previous stock.move record
-            sequence: sequence number for the move
-            current_datetime: current datetime
-            
-        Returns:
-            tuple: Move data tuple (0, 0, dict) for creation
-        """
-        # Prepare move lines with lot tracking
-        move_line_vals = self._prepare_return_move_lines(
-            line, prev_picking, picking_type_id, current_datetime
-        )
-        
-        # Prepare main move values
-        move_vals = {
-            'sequence_number': sequence,
-            'name': line.name,
-            'description_picking': line.name,
-            'product_id': line.product_id.id,
-            'product_uom': line.product_uom.id,
-            'product_uom_qty': line.product_uom_qty,
-            'date': current_datetime,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': prev_picking.location_id.id,
-            'move_line_ids': move_line_vals,
-        }
-        
-        return (0, 0, move_vals)
+            billing_date: periods ending after this day are not billed
 
-    def _prepare_return_move_lines(self, line, prev_picking, picking_type_id, current_datetime):
-        """
-        Prepare detailed move lines with lot/serial tracking from previous picking.
-        (For non-set items)
-        
-        Args:
-            line: rental extension line record
-            prev_picking: previous stock.move record
-            picking_type_id: stock.picking.type record
-            current_datetime: current datetime
-            
         Returns:
-            list: List of tuples for creating stock.move.line records
+            account.move: Created draft invoices
         """
-        move_lines = []
-        
-        if not prev_picking.move_line_ids:
-            return move_lines
-        
-        for moveline in prev_picking.move_line_ids:
-            move_line_vals = {
-                'product_id': line.product_id.id,
-                'product_uom_id': line.product_uom.id,
-                'product_uom_qty': moveline.qty_done,
-                'qty_done': moveline.qty_done,
-                'date': current_datetime,
-                'location_id': picking_type_id.default_location_dest_id.id,
-                'location_dest_id': prev_picking.location_id.id,
-                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
-            }
-            move_lines.append((0, 0, move_line_vals))
-        
-        return move_lines
\ No newline at end of file
+        invoices = self.env['account.move']
+        vals_by_company = {}
+        line_ids_by_date = {}
+        for contract in self:
+            invoice_vals, billed_through = contract._prepare_invoice_vals(billing_date)
+            if not invoice_vals:
+                continue
+            vals_by_company.setdefault(contract.company_id, []).append(invoice_vals)
+            for line_id, date_to in billed_through.items():
+                line_ids_by_date.setdefault(date_to, []).append(line_id)
+
+        for company, vals_list in vals_by_company.items():
+            invoices |= self.env['account.move'].with_company(company).with_context(
+                default_move_type='out_invoice').create(vals_list)
+
+        ContractLine = self.env['rental.contract.line']
+        for date_to, line_ids in line_ids_by_date.items():
+            ContractLine.browse(line_ids).write({'billed_through_date': date_to})
+        return invoices
+
+    def action_create_invoice(self):
+        billing_date = fields.Date.context_today(self)
+        invoices = self.filtered(lambda contract: contract.state == 'signed')._create_invoices(billing_date)
+        if not invoices:
+            raise UserError(_("There is no rental period to invoice yet."))
+        return self.action_view_invoices(invoices)
+
+    def action_view_invoices(self, invoices=None):
+        if invoices is None:
+            invoices = self.invoice_ids
+        action = self.env['ir.actions.actions']._for_xml_id("account.action_move_out_invoice_type")
+        if len(invoices) == 1:
+            action['views'] = [(self.env.ref('account.view_move_form').id, 'form')]
+            action['res_id'] = invoices.id
+        else:
+            action['domain'] = [('id', 'in', invoices.ids)]
+        action['context'] = {'default_move_type': 'out_invoice'}
+        return action
+
+    @api.model
+    def _cron_invoice_rental_contracts(self, batch_size=INVOICE_BATCH_SIZE, auto_commit=False):
+        """
+        Invoice the due periods of every signed contract. Contracts are invoiced
+        by batches; a failing batch is retried contract by contract so a single
+        faulty contract doesn't block the others. With ``auto_commit`` every
+        batch is committed, an interrupted run resumes from the billed through
+        dates on the next call.
+        """
+        start = time.time()
+        billing_date = fields.Date.context_today(self)
+        contracts = self._get_contracts_to_invoice(billing_date)
+
+        invoices = self.env['account.move']
+        failed = 0
+        for batch_ids in split_every(batch_size, contracts.ids):
+            batch = self.browse(batch_ids)
+            try:
+                with self.env.cr.savepoint():
+                    invoices |= batch._create_invoices(billing_date)
+            except (UserError, psycopg2.IntegrityError, psycopg2.DataError):
+                # Serialization failures and deadlocks propagate, the next cron run retries them.
+                # retry one by one to find out which contracts are failing.
+                self.invalidate_cache()
+                for contract in batch:
+                    try:
+                        with self.env.cr.savepoint():
+                            invoices |= contract._create_invoices(billing_date)
+                    except (UserError, psycopg2.IntegrityError, psycopg2.DataError) as e:
+                        self.invalidate_cache()
+                        failed += 1
+                        _logger.warning(f"Unable to invoice rental contract {contract.name}: {e}")
+            if auto_commit:
+                self.env.cr.commit()
+
+        _logger.info(
+            f"Rental invoicing until {billing_date}: {len(invoices)} invoices created for "
+            f"{len(contracts)} contracts ({failed} failed) in {time.time() - start:.3f}s"
+        )
+        return invoices
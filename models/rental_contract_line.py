@@ -3,14 +3,20 @@
 
 from datetime import timedelta
 
+from dateutil.relativedelta import relativedelta
+
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.tools.misc import get_lang
-from dateutil.relativedelta import relativedelta
+
+from .rental_period_mixin import DURATION_UNIT_DAYS
 
 class RentalContractLine(models.Model):
     _name = 'rental.contract.line'
     _description = 'Rental Contract Line'
+    _inherit = ["rental.period.mixin", "rental.period.overlap.mixin"]
+    _rental_component_model = "rental.contract.component"
+    _rental_component_field = "contract_line_id"
     _order = 'contract_id, sequence, id'
 
     contract_id = fields.Many2one('rental.contract', string='Contract Reference', required=True,
@@ -22,7 +28,7 @@ class RentalContractLine(models.Model):
     item_code = fields.Char(string="Item Code", related="ro_line_id.item_code", required=True)
     product_id = fields.Many2one('product.product', string='Product', 
                                  domain="[('sale_ok', '=', True), '|', ('company_id', '=', False), ('company_id', '=', company_id)]",
-                                 change_default=True, ondelete='restrict')
+                                 change_default=True, ondelete='restrict', index=True)
     product_template_id = fields.Many2one(
         'product.template', string='Product Template',
         related="product_id.product_tmpl_id", domain=[('sale_ok', '=', True)])
@@ -47,7 +53,7 @@ class RentalContractLine(models.Model):
     
     item_type = fields.Selection([('unit', 'Unit'), ('set', 'Set')], related="ro_line_id.item_type", default='unit', string="Type", required=True)
     start_date = fields.Date(string="Start Date", required=False)
-    end_date = fields.Date(string="End Date", compute='_compute_end_date', required=False)
+    end_date = fields.Date(string="End Date", compute='_compute_end_date', store=True, required=False)
 
     duration = fields.Integer(string="Duration", required=True)
     duration_unit = fields.Selection([
@@ -60,6 +66,8 @@ class RentalContractLine(models.Model):
     duration_string = fields.Char(string="Duration Str", compute='_compute_duration_string')
 
     discount = fields.Float(string='Discount (%)', digits='Discount', default=0.0)
+    billed_through_date = fields.Date(string="Billed Through", readonly=True, copy=False,
+                                      help="The line is invoiced up to this day (excluded).")
     date_definition_level = fields.Selection(
         related="contract_id.date_definition_level", string="Date Definition Level",
        help="Indicates whether the start and end dates are defined at the rental order level or at the rental order item level."
@@ -334,36 +342,118 @@ class RentalContractLine(models.Model):
         for record in self:
             record.duration_string = f"{record.duration} {dict(self._fields['duration_unit'].selection).get(record.duration_unit)}"
     
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-    
     @api.depends('product_uom_qty', 'discount', 'price_unit', 'tax_id')
     def _compute_amount(self):
         """
         Compute the amounts of the SO line.
         """
+        tax_memo = {}
         for line in self:
             price = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
-            taxes = line.tax_id.compute_all(price, line.contract_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.contract_id.partner_id)
+            taxes = line.tax_id._rental_compute_all(tax_memo, price, line.contract_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.contract_id.partner_id)
             line.update({
                 'price_tax': sum(t.get('amount', 0.0) for t in taxes.get('taxes', [])),
                 'price_total': taxes['total_included'],
                 'price_subtotal': taxes['total_excluded'],
             })
     
+    def _get_due_billing_periods(self, billing_date):
+        """
+        Get the monthly periods of the line that are over and not invoiced yet.
+        Periods follow the monthly anniversaries of the start date, the last
+        one ends with the rental.
+
+        Args:
+            billing_date: periods ending after this day are not due yet
+
+        Returns:
+            list: [(date_from, date_to), ...] half-open periods, oldest first
+        """
+        self.ensure_one()
+        periods = []
+        if not self.start_date:
+            return periods
+
+        date_from = self.billed_through_date or self.start_date
+        months = 1
+        while not self.end_date or date_from < self.end_date:
+            date_to = self.start_date + relativedelta(months=months)
+            months += 1
+            if self.end_date:
+                date_to = min(date_to, self.end_date)
+            if date_to <= date_from:
+                continue
+            if date_to > billing_date:
+                break
+            periods.append((date_from, date_to))
+            date_from = date_to
+        return periods
+
+    def _get_billed_units(self, date_from, date_to):
+        """
+        Get the number of duration units covered by a billing period. A full
+        month counts as one month, shorter periods are prorated on their days.
+        """
+        self.ensure_one()
+        if self.duration_unit == 'month':
+            month_end = date_from + relativedelta(months=1)
+            if date_to >= month_end:
+                return 1.0
+            return (date_to - date_from).days / (month_end - date_from).days
+        return (date_to - date_from).days / DURATION_UNIT_DAYS.get(self.duration_unit, 1.0)
+
+    def _get_billed_amount_until(self, date):
+        """
+        Get the share of the line price accrued from the start date until
+        ``date`` (excluded). ``price_unit`` prices the whole rental, every
+        billing period gets ``price_unit / duration`` per duration unit and the
+        share reaches ``price_unit`` exactly on the end date.
+
+        Returns:
+            float: accrued unit price, rounded to the currency
+        """
+        self.ensure_one()
+        if self.end_date and date >= self.end_date:
+            return self.price_unit
+        if not self.start_date or not self.duration or date <= self.start_date:
+            return 0.0
+
+        units = 0.0
+        date_from = self.start_date
+        months = 1
+        while date_from < date:
+            date_to = min(self.start_date + relativedelta(months=months), date)
+            months += 1
+            units += self._get_billed_units(date_from, date_to)
+            date_from = date_to
+        amount = self.price_unit * min(units / self.duration, 1.0)
+        return self.currency_id.round(amount) if self.currency_id else amount
+
+    def _prepare_invoice_line_vals(self, date_from, date_to):
+        """
+        Prepare the invoice line billing one period of the line.
+
+        Args:
+            date_from: first day of the period
+            date_to: day after the last day of the period
+
+        Returns:
+            dict: Values for account.move.line creation
+        """
+        self.ensure_one()
+        vals = {
+            'name': "%s\n%s - %s" % (self.name, date_from, date_to - timedelta(days=1)),
+            'product_id': self.product_id.id or False,
+            'quantity': self.product_uom_qty,
+            # Differences of accrued shares, so the periods add up to the line price.
+            'price_unit': self._get_billed_amount_until(date_to) - self._get_billed_amount_until(date_from),
+            'discount': self.discount,
+            'tax_ids': [(6, 0, self.tax_id.ids)],
+        }
+        if self.product_uom:
+            vals['product_uom_id'] = self.product_uom.id
+        return vals
+
     @api.onchange('product_id')
     def product_id_change(self):
         self._update_description()
@@ -408,7 +498,7 @@ class RentalContractLine(models.Model):
         )
 
         if self.contract_id.pricelist_id and self.contract_id.partner_id:
-            rental_pricing_list = self._get_rental_pricing_list(product)
+            rental_pricing_list = product._get_rental_pricing_list()
             if not rental_pricing_list:
                 raise ValidationError(
                     "Rental price for the selected duration (%s) is not configured for this product. Please contact the administrator or choose different duration." % (self.duration_unit)
@@ -433,12 +523,6 @@ class RentalContractLine(models.Model):
 
         self.update(vals)
 
-    def _get_rental_pricing_list(self, product):
-        if not product or not product.rental_pricing_ids:
-            return False
-        
-        return {price.unit: price.price for price in product.rental_pricing_ids}
-    
     @api.onchange('component_line_ids')
     def onchange_component_line_ids(self):
         for rec in self:
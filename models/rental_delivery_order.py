@@ -1,7 +1,15 @@
 # -*- coding: utf-8 -*-
 
+import hashlib
+
 from odoo import api, fields, models, _
 
+# Name prefix of the cached PDFs of done rental pickings.
+RENTAL_REPORT_CACHE_PREFIX = "RENTAL-PDF-"
+
+# Picking columns updated by the chatter (e.g. when a PDF is posted) without changing the report content.
+RENTAL_REPORT_CACHE_IGNORED_FIELDS = {'write_date', 'write_uid', 'message_main_attachment_id'}
+
 class StockPicking(models.Model):
     _inherit = "stock.picking"
     _order = "scheduled_date desc, id desc"
@@ -17,25 +25,152 @@ class StockPicking(models.Model):
 
     @api.onchange('is_rental_do')
     def onchange_rental_do(self):
-        default_picking_type = "Delivery Orders"
-        rental_picking_type = self.env["stock.picking.type"].search([('name', '=', "Rental Delivery Orders")], limit=1)
-        if not rental_picking_type:
-            rental_picking_type = self.env["stock.picking.type"].search([('name', '=', default_picking_type)], limit=1)
         for rec in self:
-            rec.picking_type_id = rental_picking_type.id
+            rec.picking_type_id = self.env['stock.warehouse']._get_rental_picking_type(
+                'delivery', company=rec.company_id
+            ).id
 
     def action_print_rental_picking_list(self):
-        return self.env.ref("gdi_rental.gdi_action_report_rental_picking_list").report_action(self) 
+        return self.env.ref("gdi_rental.gdi_action_report_rental_picking_list").report_action(self)
     
     def action_print_rdo_pdf(self):
         return self.env.ref("gdi_rental.gdi_action_report_rdo").report_action(self)
 
+    def _get_rental_report_cache_name(self, report_code):
+        """
+        Get the attachment name caching a rental report of a done rental
+        picking. The name hashes the stored values of the picking and the write
+        dates of its rental items, moves and move lines, so any change produces
+        a new name and the report is rendered again. Chatter bookkeeping on the
+        picking keeps the name.
+
+        Args:
+            report_code: short code of the report
+
+        Returns:
+            str: attachment name, False when the report must not be cached
+        """
+        self.ensure_one()
+        if not self.is_rental_do or self.state != 'done':
+            return False
+        picking_key = "|".join(
+            f"{fname}={self[fname]!r}" for fname, field in sorted(self._fields.items())
+            if field.store and field.column_type and fname not in RENTAL_REPORT_CACHE_IGNORED_FIELDS
+        )
+        records = self.rental_order_item_ids | self.move_lines | self.move_line_ids
+        key = "|".join(f"{record._name},{record.id},{record.write_date}" for record in records)
+        digest = hashlib.sha1(f"{picking_key}|{key}".encode()).hexdigest()[:16]
+        return f"{RENTAL_REPORT_CACHE_PREFIX}{report_code}-{self.name}-{digest}.pdf"
+
+    def _clean_rental_report_cache(self, keep_name):
+        """
+        Remove the cached PDFs of the same report superseded by ``keep_name``.
+        PDFs posted in the chatter are kept with their message.
+        """
+        self.ensure_one()
+        prefix = keep_name.rsplit('-', 1)[0] + '-'
+        attachments = self.env['ir.attachment'].sudo().search([
+            ('res_model', '=', self._name),
+            ('res_id', '=', self.id),
+            ('name', '!=', keep_name),
+        ]).filtered(lambda attachment: attachment.name.startswith(prefix))
+        if attachments:
+            posted = self.env['mail.message'].sudo().search([('attachment_ids', 'in', attachments.ids)]).attachment_ids
+            (attachments - posted).unlink()
+
+    def _rental_report_needs_queue(self, report):
+        """
+        Large pickings are rendered by the report queue, unless the PDF of every
+        picking is already cached.
+
+        Args:
+            report: ir.actions.report record
+
+        Returns:
+            bool: True when the report must be rendered in background
+        """
+        if len(self.move_lines) <= self.env['rental.report.job']._get_async_threshold():
+            return False
+        if report.attachment_use and all(report._retrieve_attachment(picking) for picking in self):
+            return False
+        return True
+
 class StockMove(models.Model):
     _inherit = "stock.move"
     
-    rental_order_item_id = fields.Many2one("stock.rental.order.item", string="Rental Order Item")
-    ro_line_id = fields.Many2one("gdi.rental.order.line", string="Rental Order Line")
-    rental_order_component_id = fields.Many2one("rental.order.component", string="Rental Order Component")
+    rental_order_item_id = fields.Many2one("stock.rental.order.item", string="Rental Order Item", index=True)
+    ro_line_id = fields.Many2one("gdi.rental.order.line", string="Rental Order Line", index=True)
+    rental_order_component_id = fields.Many2one("rental.order.component", string="Rental Order Component", index=True)
+
+    def _action_done(self, cancel_backorder=False):
+        self.filtered(lambda m: m.rental_order_item_id and m.ro_line_id)._allocate_rental_lots()
+        moves = super(StockMove, self)._action_done(cancel_backorder=cancel_backorder)
+        moves._update_rental_move_pointers()
+        moves._update_rental_lot_ledger()
+        return moves
+
+    def _update_rental_lot_ledger(self):
+        """Record the lots delivered and returned by done rental moves in the lot ledger."""
+        rental_moves = self.filtered(lambda m: m.state == 'done' and m.ro_line_id)
+        out_moves = rental_moves.filtered('rental_order_item_id')
+        Ledger = self.env['rental.lot.ledger']
+        Ledger._record_in_moves(rental_moves - out_moves)
+        Ledger._record_out_moves(out_moves)
+
+    def _update_rental_move_pointers(self):
+        """
+        Point rental order lines and components to their last done outgoing
+        (delivered with a rental order item) and incoming (returned) moves.
+        """
+        rental_moves = self.filtered(lambda m: m.state == 'done' and m.ro_line_id)
+        if not rental_moves:
+            return
+
+        self.flush(['state', 'date', 'ro_line_id', 'rental_order_item_id', 'rental_order_component_id'])
+        targets = [
+            ('gdi_rental_order_line', 'ro_line_id', tuple(rental_moves.ro_line_id.ids)),
+        ]
+        if rental_moves.rental_order_component_id:
+            targets.append(('rental_order_component', 'rental_order_component_id',
+                            tuple(rental_moves.rental_order_component_id.ids)))
+
+        for table, move_column, record_ids in targets:
+            for pointer, direction in (('last_out_move_id', 'IS NOT NULL'), ('last_in_move_id', 'IS NULL')):
+                # table, columns and direction are constants, only ids are parameters.
+                self._cr.execute(f"""
+                    UPDATE {table} AS target SET {pointer} = last_move.move_id
+                    FROM (
+                        SELECT DISTINCT ON ({move_column}) {move_column} AS record_id, id AS move_id
+                        FROM stock_move
+                        WHERE {move_column} IN %s AND state = 'done' AND rental_order_item_id {direction}
+                        ORDER BY {move_column}, date DESC, id DESC
+                    ) AS last_move
+                    WHERE target.id = last_move.record_id
+                """, (record_ids, ))
+
+        self.env['gdi.rental.order.line'].invalidate_cache(['last_out_move_id', 'last_in_move_id'])
+        self.env['rental.order.component'].invalidate_cache(['last_out_move_id', 'last_in_move_id'])
+
+    def _allocate_rental_lots(self):
+        """
+        Allocate the lots/serial numbers picked on outgoing rental moves over the
+        rental period of their order line.
+        """
+        vals_list = []
+        for move in self:
+            line = move.ro_line_id
+            if not line.start_date:
+                continue
+            for move_line in move.move_line_ids.filtered('lot_id'):
+                vals_list.append({
+                    'lot_id': move_line.lot_id.id,
+                    'product_id': move_line.product_id.id,
+                    'ro_line_id': line.id,
+                    'component_id': move.rental_order_component_id.id or False,
+                    'date_from': line.start_date,
+                    'date_to': line.end_date,
+                })
+        return self.env['rental.lot.allocation']._allocate(vals_list)
 
 class StockRentalOrderItem(models.Model):
     _name = "stock.rental.order.item"
@@ -95,9 +230,10 @@ class StockRentalOrderItem(models.Model):
         """
         Compute the amounts of the SO line.
         """
+        tax_memo = {}
         for line in self:
             price = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
-            taxes = line.tax_id.compute_all(price, line.picking_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.picking_id.partner_id)
+            taxes = line.tax_id._rental_compute_all(tax_memo, price, line.picking_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.picking_id.partner_id)
             line.update({
                 'price_tax': sum(t.get('amount', 0.0) for t in taxes.get('taxes', [])),
                 'price_total': taxes['total_included'],
@@ -0,0 +1,180 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_EXPIRY_NOTICE_DAYS = 7
+
+
+class RentalExpiryScanner(models.AbstractModel):
+    _name = "rental.expiry.scanner"
+    _description = "Rental Expiry Scanner"
+
+    @api.model
+    def _get_expiry_notice_days(self):
+        notice_days = self.env['ir.config_parameter'].sudo().get_param('gdi_rental.expiry_notice_days')
+        try:
+            return int(notice_days)
+        except (TypeError, ValueError):
+            return DEFAULT_EXPIRY_NOTICE_DAYS
+
+    @api.model
+    def _get_expiring_orders(self, date_from, date_to):
+        """
+        Get the ongoing rental orders ending between ``date_from`` and
+        ``date_to`` which were not notified for that end date yet. Item level
+        orders also match through their active lines.
+
+        Args:
+            date_from: first end date to report
+            date_to: last end date to report
+
+        Returns:
+            dict: {order_id: (end date, salesperson id)}
+        """
+        self.env['gdi.rental.order'].flush(['state', 'end_date', 'effective_end_date', 'user_id', 'expiry_notified_date'])
+        self.env['gdi.rental.order.line'].flush(['order_id', 'rental_state', 'end_date'])
+        # Both branches are served by the partial indexes created in init().
+        self._cr.execute("""
+            SELECT id, COALESCE(effective_end_date, end_date), user_id, expiry_notified_date FROM gdi_rental_order
+            WHERE state = 'ongoing' AND
+                  COALESCE(effective_end_date, end_date) BETWEEN %(date_from)s AND %(date_to)s
+            UNION ALL
+            SELECT o.id, MIN(line.end_date), o.user_id, o.expiry_notified_date
+            FROM gdi_rental_order_line AS line
+            JOIN gdi_rental_order AS o ON o.id = line.order_id
+            WHERE line.rental_state = 'active' AND line.end_date BETWEEN %(date_from)s AND %(date_to)s AND
+                  o.state = 'ongoing'
+            GROUP BY o.id, o.user_id, o.expiry_notified_date
+        """, {'date_from': date_from, 'date_to': date_to})
+        result = {}
+        notified = {}
+        for order_id, end_date, user_id, notified_date in self._cr.fetchall():
+            notified[order_id] = notified_date
+            if order_id not in result or end_date < result[order_id][0]:
+                result[order_id] = (end_date, user_id)
+        return {
+            order_id: values for order_id, values in result.items()
+            if notified[order_id] != values[0]
+        }
+
+    @api.model
+    def _get_expiring_contracts(self, date_from, date_to):
+        """
+        Get the signed rental contracts ending between ``date_from`` and
+        ``date_to`` which were not notified for that end date yet.
+
+        Args:
+            date_from: first end date to report
+            date_to: last end date to report
+
+        Returns:
+            dict: {contract_id: (end date, salesperson id)}
+        """
+        self.env['rental.contract'].flush(['state', 'end_date', 'user_id', 'expiry_notified_date'])
+        self._cr.execute("""
+            SELECT id, end_date, user_id FROM rental_contract
+            WHERE state = 'signed' AND end_date BETWEEN %s AND %s AND
+                  expiry_notified_date IS DISTINCT FROM end_date
+        """, (date_from, date_to))
+        return {contract_id: (end_date, user_id) for contract_id, end_date, user_id in self._cr.fetchall()}
+
+    @api.model
+    def _mark_expiry_notified(self, model_name, expiring):
+        """Remember the end date every record was notified for, one write per date."""
+        ids_by_date = {}
+        for res_id, (end_date, user_id) in expiring.items():
+            ids_by_date.setdefault(end_date, []).append(res_id)
+        for end_date, res_ids in ids_by_date.items():
+            self.env[model_name].browse(res_ids).write({'expiry_notified_date': end_date})
+
+    @api.model
+    def _schedule_expiry_activities(self, model_name, expiring, summary):
+        """
+        Create one expiry activity per record in a single batch. Records that
+        already have an open expiry activity are skipped.
+
+        Args:
+            model_name: model of the expiring records
+            expiring: dict {res_id: (end date, user id)}
+            summary: activity summary
+
+        Returns:
+            mail.activity: Created activities
+        """
+        Activity = self.env['mail.activity']
+        activity_type = self.env.ref('gdi_rental.mail_activity_rental_expiry', raise_if_not_found=False)
+        if not expiring or not activity_type:
+            return Activity
+
+        existing = Activity.search_read([
+            ('res_model', '=', model_name),
+            ('res_id', 'in', list(expiring)),
+            ('activity_type_id', '=', activity_type.id),
+        ], ['res_id'])
+        scheduled_ids = {activity['res_id'] for activity in existing}
+
+        res_model_id = self.env['ir.model']._get_id(model_name)
+        vals_list = [{
+            'res_model_id': res_model_id,
+            'res_id': res_id,
+            'activity_type_id': activity_type.id,
+            'summary': summary,
+            'date_deadline': end_date,
+            'user_id': user_id or self.env.uid,
+        } for res_id, (end_date, user_id) in expiring.items() if res_id not in scheduled_ids]
+        # Skip the assignation e-mail of every single activity.
+        return Activity.with_context(mail_activity_quick_update=True).create(vals_list)
+
+    @api.model
+    def _cron_scan_expiring_rentals(self):
+        """
+        Schedule an activity on every rental order and contract ending within
+        the notice period, once per end date. Overdue rentals are not notified
+        again, extended ones are notified for their new end date.
+        """
+        start = time.time()
+        today = fields.Date.context_today(self)
+        limit_date = today + timedelta(days=self._get_expiry_notice_days())
+
+        expiring_orders = self._get_expiring_orders(today, limit_date)
+        expiring_contracts = self._get_expiring_contracts(today, limit_date)
+        scan_duration = time.time() - start
+
+        order_activities = self._schedule_expiry_activities(
+            'gdi.rental.order', expiring_orders, _("Rental order is about to end"))
+        contract_activities = self._schedule_expiry_activities(
+            'rental.contract', expiring_contracts, _("Rental contract is about to end"))
+        self._mark_expiry_notified('gdi.rental.order', expiring_orders)
+        self._mark_expiry_notified('rental.contract', expiring_contracts)
+
+        log = self.env['rental.expiry.scan.log'].sudo().create({
+            'limit_date': limit_date,
+            'order_count': len(expiring_orders),
+            'contract_count': len(expiring_contracts),
+            'activity_count': len(order_activities) + len(contract_activities),
+            'scan_duration': scan_duration,
+            'duration': time.time() - start,
+        })
+        _logger.info(
+            f"Rental expiry scan until {limit_date}: {log.order_count} orders and "
+            f"{log.contract_count} contracts found in {log.scan_duration:.3f}s, "
+            f"{log.activity_count} activities created in {log.duration:.3f}s"
+        )
+
+
+class RentalExpiryScanLog(models.Model):
+    _name = "rental.expiry.scan.log"
+    _description = "Rental Expiry Scan Log"
+    _order = "create_date desc, id desc"
+
+    limit_date = fields.Date(string="Notified Until", readonly=True)
+    order_count = fields.Integer(string="Orders Found", readonly=True)
+    contract_count = fields.Integer(string="Contracts Found", readonly=True)
+    activity_count = fields.Integer(string="Activities Created", readonly=True)
+    scan_duration = fields.Float(string="Scan Time (s)", digits=(16, 3), readonly=True)
+    duration = fields.Float(string="Total Time (s)", digits=(16, 3), readonly=True)
@@ -0,0 +1,159 @@
+# -*- coding: utf-8 -*-
+
+import psycopg2
+from psycopg2 import errorcodes
+
+from odoo import api, fields, models, _
+from odoo.exceptions import ValidationError
+
+
+class RentalLotAllocation(models.Model):
+    _name = "rental.lot.allocation"
+    _description = "Rental Lot Allocation"
+    _order = "date_from desc, id desc"
+
+    lot_id = fields.Many2one("stock.production.lot", string="Lot/Serial Number", required=True, ondelete="cascade", index=True)
+    product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="cascade")
+    ro_line_id = fields.Many2one("gdi.rental.order.line", string="Rental Order Line", required=True, ondelete="cascade", index=True)
+    component_id = fields.Many2one("rental.order.component", string="Rental Order Component", ondelete="cascade")
+    order_id = fields.Many2one(related="ro_line_id.order_id", string="Rental Order", store=True)
+    date_from = fields.Date(string="From", required=True)
+    date_to = fields.Date(string="To", help="Day after the last allocated day. Empty for an open-ended allocation.")
+    released = fields.Boolean(string="Released", default=False, help="Set once the lot has been hired-off.")
+
+    _sql_constraints = [
+        ('date_check', 'CHECK(date_to IS NULL OR date_to >= date_from)',
+         'The end of a lot allocation cannot be before its start.'),
+        ('lot_period_excl', "EXCLUDE USING gist (lot_id WITH =, daterange(date_from, date_to, '[)') WITH &&)",
+         'This lot/serial number is already allocated to another rental for an overlapping period.'),
+    ]
+
+    def _auto_init(self):
+        # The exclusion constraint compares an integer with "=" inside a GiST index.
+        self._cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        return super(RentalLotAllocation, self)._auto_init()
+
+    @api.model
+    def _allocate(self, vals_list):
+        """
+        Allocate lots to rental order lines. Lots already allocated to the same
+        line are skipped; overlapping allocations are rejected by the database.
+
+        Args:
+            vals_list: list of dict values for rental.lot.allocation creation
+
+        Returns:
+            rental.lot.allocation: Created allocations
+
+        Raises:
+            ValidationError: when a lot is already allocated over an overlapping period
+        """
+        vals_list = [vals for vals in vals_list if vals.get('lot_id') and vals.get('ro_line_id')]
+        if not vals_list:
+            return self.browse()
+
+        existing = self.search_read([
+            ('lot_id', 'in', list({vals['lot_id'] for vals in vals_list})),
+            ('ro_line_id', 'in', list({vals['ro_line_id'] for vals in vals_list})),
+            ('released', '=', False),
+        ], ['lot_id', 'ro_line_id'])
+        allocated = {(rec['lot_id'][0], rec['ro_line_id'][0]) for rec in existing}
+
+        new_vals_list = []
+        for vals in vals_list:
+            key = (vals['lot_id'], vals['ro_line_id'])
+            if key not in allocated:
+                allocated.add(key)
+                new_vals_list.append(vals)
+        if not new_vals_list:
+            return self.browse()
+
+        try:
+            with self.env.cr.savepoint():
+                allocations = self.create(new_vals_list)
+                allocations.flush()
+        except psycopg2.IntegrityError as e:
+            if e.pgcode != errorcodes.EXCLUSION_VIOLATION:
+                raise
+            self._raise_allocation_conflict(new_vals_list)
+        return allocations
+
+    @api.model
+    def _raise_allocation_conflict(self, vals_list):
+        """Report which lots are already allocated over the requested periods."""
+        self.invalidate_cache()
+        conflicts = []
+        for vals in vals_list:
+            other = self.search([
+                ('lot_id', '=', vals['lot_id']),
+                ('ro_line_id', '!=', vals['ro_line_id']),
+                '|', ('date_to', '=', False), ('date_to', '>', vals['date_from']),
+            ] + ([('date_from', '<', vals['date_to'])] if vals.get('date_to') else []), limit=1)
+            if other:
+                conflicts.append(_("- %s is allocated to %s from %s to %s") % (
+                    other.lot_id.name, other.order_id.name, other.date_from, other.date_to or _("(open)")
+                ))
+        raise ValidationError(
+            _("The following lots/serial numbers are already allocated to another rental:\n%s") % "\n".join(conflicts)
+        )
+
+    @api.model
+    def _release(self, lines, release_date):
+        """
+        End the allocations of hired-off lines on ``release_date``.
+
+        Args:
+            lines: gdi.rental.order.line recordset
+            release_date: day the lots are back in stock
+        """
+        if not lines:
+            return
+        self.flush(['ro_line_id', 'date_from', 'date_to', 'released'])
+        self._cr.execute("""
+            UPDATE rental_lot_allocation
+            SET date_to = CASE WHEN date_to IS NULL OR date_to > %(date)s
+                               THEN GREATEST(date_from, %(date)s) ELSE date_to END,
+                released = TRUE,
+                write_uid = %(uid)s,
+                write_date = NOW() AT TIME ZONE 'UTC'
+            WHERE ro_line_id IN %(line_ids)s AND NOT released
+        """, {'date': release_date, 'uid': self.env.uid, 'line_ids': tuple(lines.ids)})
+        self.invalidate_cache()
+
+    @api.model
+    def _extend(self, end_dates):
+        """
+        Extend the running allocations of rental order lines.
+
+        Args:
+            end_dates: dict {line_id: new date_to}
+
+        Raises:
+            ValidationError: when a lot is already allocated over the extended period
+        """
+        line_ids_by_date = {}
+        for line_id, date_to in end_dates.items():
+            if date_to:
+                line_ids_by_date.setdefault(date_to, []).append(line_id)
+        if not line_ids_by_date:
+            return
+
+        self.flush(['ro_line_id', 'date_to', 'released'])
+        try:
+            with self.env.cr.savepoint():
+                for date_to, line_ids in line_ids_by_date.items():
+                    self._cr.execute("""
+                        UPDATE rental_lot_allocation
+                        SET date_to = %(date)s, write_uid = %(uid)s, write_date = NOW() AT TIME ZONE 'UTC'
+                        WHERE ro_line_id IN %(line_ids)s AND NOT released AND
+                              date_to IS NOT NULL AND date_to < %(date)s
+                    """, {'date': date_to, 'uid': self.env.uid, 'line_ids': tuple(line_ids)})
+        except psycopg2.IntegrityError as e:
+            if e.pgcode != errorcodes.EXCLUSION_VIOLATION:
+                raise
+            self.invalidate_cache()
+            raise ValidationError(
+                _("Unable to extend the rental: some lots/serial numbers are already allocated "
+                  "to another rental within the extended period.")
+            )
+        self.invalidate_cache()
@@ -0,0 +1,118 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+
+class RentalLotLedger(models.Model):
+    _name = "rental.lot.ledger"
+    _description = "Rental Lot Ledger"
+    _order = "date_out desc, id desc"
+
+    lot_id = fields.Many2one("stock.production.lot", string="Lot/Serial Number", required=True, ondelete="cascade", readonly=True)
+    product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="cascade", readonly=True)
+    ro_line_id = fields.Many2one("gdi.rental.order.line", string="Rental Order Line", ondelete="set null", readonly=True, index=True)
+    component_id = fields.Many2one("rental.order.component", string="Rental Order Component", ondelete="set null", readonly=True)
+    contract_id = fields.Many2one("rental.contract", string="Contract", ondelete="set null", readonly=True)
+    partner_id = fields.Many2one("res.partner", string="Customer", ondelete="set null", readonly=True)
+    out_move_id = fields.Many2one("stock.move", string="Outgoing Move", ondelete="set null", readonly=True)
+    in_move_id = fields.Many2one("stock.move", string="Incoming Move", ondelete="set null", readonly=True)
+    date_out = fields.Datetime(string="Out Date", required=True, readonly=True)
+    date_in = fields.Datetime(string="In Date", readonly=True)
+    qty = fields.Float(string="Quantity", digits='Product Unit of Measure', readonly=True)
+
+    def init(self):
+        # Rows without incoming move are the lots currently on hire.
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_lot_ledger_on_hire_lot_idx
+            ON rental_lot_ledger (lot_id) WHERE in_move_id IS NULL
+        """)
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_lot_ledger_on_hire_partner_idx
+            ON rental_lot_ledger (partner_id, lot_id) WHERE in_move_id IS NULL
+        """)
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_lot_ledger_lot_date_idx
+            ON rental_lot_ledger (lot_id, date_out DESC)
+        """)
+
+    @api.model
+    def _record_out_moves(self, moves):
+        """
+        Append one ledger row per lot delivered by outgoing rental moves.
+
+        Args:
+            moves: done stock.move recordset carrying a rental order item
+        """
+        vals_list = []
+        for move in moves:
+            picking = move.picking_id
+            for move_line in move.move_line_ids.filtered(lambda ml: ml.lot_id and ml.qty_done):
+                vals_list.append({
+                    'lot_id': move_line.lot_id.id,
+                    'product_id': move_line.product_id.id,
+                    'ro_line_id': move.ro_line_id.id,
+                    'component_id': move.rental_order_component_id.id or False,
+                    'contract_id': picking.rental_contract_id.id or False,
+                    'partner_id': picking.partner_id.id or False,
+                    'out_move_id': move.id,
+                    'date_out': move.date,
+                    'qty': move_line.qty_done,
+                })
+        if vals_list:
+            self.sudo().create(vals_list)
+
+    @api.model
+    def _record_in_moves(self, moves):
+        """
+        Close the open ledger rows of the lots returned by incoming rental moves.
+
+        Args:
+            moves: done stock.move recordset returning rental order lines
+        """
+        lot_ids, line_ids, move_ids, dates = [], [], [], []
+        for move in moves:
+            for move_line in move.move_line_ids.filtered(lambda ml: ml.lot_id and ml.qty_done):
+                lot_ids.append(move_line.lot_id.id)
+                line_ids.append(move.ro_line_id.id)
+                move_ids.append(move.id)
+                dates.append(move.date)
+        if not lot_ids:
+            return
+
+        self.flush(['lot_id', 'ro_line_id', 'in_move_id'])
+        self._cr.execute("""
+            UPDATE rental_lot_ledger AS ledger
+            SET in_move_id = returned.move_id, date_in = returned.date,
+                write_uid = %(uid)s, write_date = NOW() AT TIME ZONE 'UTC'
+            FROM unnest(%(lot_ids)s::int[], %(line_ids)s::int[], %(move_ids)s::int[], %(dates)s::timestamp[])
+                 AS returned(lot_id, ro_line_id, move_id, date)
+            WHERE ledger.in_move_id IS NULL AND
+                  ledger.lot_id = returned.lot_id AND
+                  ledger.ro_line_id = returned.ro_line_id
+        """, {
+            'uid': self.env.uid,
+            'lot_ids': lot_ids,
+            'line_ids': line_ids,
+            'move_ids': move_ids,
+            'dates': dates,
+        })
+        self.invalidate_cache(['in_move_id', 'date_in'])
+
+    @api.model
+    def _get_on_hire(self, lot_ids=None, partner_ids=None):
+        """
+        Get the lots currently on hire, optionally restricted to some lots or customers.
+
+        Args:
+            lot_ids: list of stock.production.lot ids
+            partner_ids: list of res.partner ids
+
+        Returns:
+            rental.lot.ledger: Open ledger rows
+        """
+        domain = [('in_move_id', '=', False)]
+        if lot_ids is not None:
+            domain.append(('lot_id', 'in', lot_ids))
+        if partner_ids is not None:
+            domain.append(('partner_id', 'in', partner_ids))
+        return self.search(domain)
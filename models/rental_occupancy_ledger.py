@@ -0,0 +1,183 @@
+# -*- coding: utf-8 -*-
+
+import json
+from collections import defaultdict
+
+from odoo import api, fields, models
+
+
+class RentalOccupancyLedger(models.Model):
+    _name = "rental.occupancy.ledger"
+    _description = "Rental Occupancy Ledger"
+    _order = "date, product_id"
+
+    product_id = fields.Many2one("product.product", string="Product", required=True, ondelete="cascade", index=True)
+    warehouse_id = fields.Many2one("stock.warehouse", string="Warehouse", required=True, ondelete="cascade")
+    date = fields.Date(string="Date", required=True)
+    qty = fields.Float(string="Committed Qty", digits='Product Unit of Measure', default=0.0)
+
+    _sql_constraints = [
+        ('product_warehouse_date_uniq', 'unique(product_id, warehouse_id, date)',
+         'Only one occupancy entry per product, warehouse and day is allowed.'),
+    ]
+
+    @api.model
+    def _apply_entries(self, entries):
+        """
+        Add committed quantities to the ledger, one row per product, warehouse and day.
+        Every entry covers the half-open period [date_from, date_to); negative
+        quantities release a previous commitment.
+
+        Args:
+            entries: list of (product_id, warehouse_id, date_from, date_to, qty) tuples
+        """
+        entries = [
+            entry for entry in entries
+            if entry[0] and entry[1] and entry[2] and entry[3] and entry[3] > entry[2] and entry[4]
+        ]
+        if not entries:
+            return
+
+        product_ids, warehouse_ids, date_froms, date_tos, qtys = (list(values) for values in zip(*entries))
+        self._cr.execute("""
+            INSERT INTO rental_occupancy_ledger (product_id, warehouse_id, date, qty,
+                                                 create_uid, create_date, write_uid, write_date)
+            SELECT entry.product_id, entry.warehouse_id, day::date, SUM(entry.qty),
+                   %(uid)s, NOW() AT TIME ZONE 'UTC', %(uid)s, NOW() AT TIME ZONE 'UTC'
+            FROM unnest(%(product_ids)s::int[], %(warehouse_ids)s::int[],
+                        %(date_froms)s::date[], %(date_tos)s::date[], %(qtys)s::numeric[])
+                 AS entry(product_id, warehouse_id, date_from, date_to, qty)
+            CROSS JOIN LATERAL generate_series(entry.date_from::timestamp,
+                                               (entry.date_to - 1)::timestamp,
+                                               interval '1 day') AS day
+            GROUP BY entry.product_id, entry.warehouse_id, day::date
+            ON CONFLICT (product_id, warehouse_id, date)
+            DO UPDATE SET qty = rental_occupancy_ledger.qty + EXCLUDED.qty,
+                          write_uid = EXCLUDED.write_uid,
+                          write_date = EXCLUDED.write_date
+        """, {
+            'uid': self.env.uid,
+            'product_ids': product_ids,
+            'warehouse_ids': warehouse_ids,
+            'date_froms': date_froms,
+            'date_tos': date_tos,
+            'qtys': qtys,
+        })
+        self._cr.execute("""
+            DELETE FROM rental_occupancy_ledger
+            WHERE product_id IN %s AND qty = 0
+        """, (tuple(set(product_ids)), ))
+        self.invalidate_cache()
+
+    @api.model
+    def _sync_lines(self, lines, periods, keep_quantities=False):
+        """
+        Move the committed period of rental order lines to a new period.
+        The previous commitment of each line is released exactly as it was
+        committed (quantities and warehouse stored on the line), and the new
+        one is committed within the same ledger statement.
+
+        Args:
+            lines: gdi.rental.order.line recordset
+            periods: dict {line_id: (date_from, date_to)}, (False, False) releases the line
+            keep_quantities: commit the new period with the previously committed
+                quantities and warehouse instead of the current ones of the line
+        """
+        entries = []
+        line_ids_by_commitment = defaultdict(list)
+        for line in lines:
+            date_from, date_to = periods.get(line.id, (False, False))
+            committed_quantities = line._get_committed_occupancy_quantities()
+            committed_warehouse_id = (line.occupancy_warehouse_id or line.warehouse_id).id
+            if line.occupancy_start_date and line.occupancy_end_date:
+                entries.extend(
+                    (product_id, committed_warehouse_id,
+                     line.occupancy_start_date, line.occupancy_end_date, -qty)
+                    for product_id, qty in committed_quantities
+                )
+
+            quantities, warehouse_id = [], False
+            if date_from and date_to:
+                if keep_quantities:
+                    quantities, warehouse_id = committed_quantities, committed_warehouse_id
+                else:
+                    quantities, warehouse_id = line._get_occupancy_quantities(), line.warehouse_id.id
+                entries.extend(
+                    (product_id, warehouse_id, date_from, date_to, qty) for product_id, qty in quantities
+                )
+            commitment = (date_from or False, date_to or False, warehouse_id,
+                          json.dumps(quantities) if date_from and date_to else False)
+            line_ids_by_commitment[commitment].append(line.id)
+
+        self._apply_entries(entries)
+        for (date_from, date_to, warehouse_id, qty_json), line_ids in line_ids_by_commitment.items():
+            lines.browse(line_ids).write({
+                'occupancy_start_date': date_from,
+                'occupancy_end_date': date_to,
+                'occupancy_warehouse_id': warehouse_id,
+                'occupancy_qty_json': qty_json,
+            })
+
+    @api.model
+    def _get_committed_qty(self, product_ids, warehouse_id, date_from, date_to):
+        """
+        Get the peak committed quantity of products over a period.
+
+        Args:
+            product_ids: list of product ids
+            warehouse_id: stock.warehouse id
+            date_from: first day of the period
+            date_to: day after the last day of the period
+
+        Returns:
+            dict: {product_id: peak committed qty}, products without commitments are omitted
+        """
+        return self._get_committed_qty_excluding(
+            [(product_id, product_id, False, False, 0.0) for product_id in set(product_ids)],
+            warehouse_id, date_from, date_to,
+        )
+
+    @api.model
+    def _get_committed_qty_excluding(self, exclusions, warehouse_id, date_from, date_to):
+        """
+        Get the peak committed quantity of products over a period, leaving out
+        a commitment of its own for every requested key. The own quantity is
+        excluded day by day, only over the period it was committed for.
+
+        Args:
+            exclusions: list of (key, product_id, own_date_from, own_date_to, own_qty)
+                tuples, own dates are False when there is nothing to exclude
+            warehouse_id: stock.warehouse id
+            date_from: first day of the period
+            date_to: day after the last day of the period
+
+        Returns:
+            dict: {key: peak committed qty}, keys without commitments are omitted
+        """
+        if not exclusions:
+            return {}
+
+        keys, product_ids, own_froms, own_tos, own_qtys = (list(values) for values in zip(*exclusions))
+        self.flush(['product_id', 'warehouse_id', 'date', 'qty'])
+        self._cr.execute("""
+            SELECT entry.key, MAX(ledger.qty - CASE
+                       WHEN ledger.date >= entry.own_from AND ledger.date < entry.own_to THEN entry.own_qty
+                       ELSE 0 END)::float AS committed_qty
+            FROM unnest(%(keys)s::int[], %(product_ids)s::int[],
+                        %(own_froms)s::date[], %(own_tos)s::date[], %(own_qtys)s::numeric[])
+                 AS entry(key, product_id, own_from, own_to, own_qty)
+            JOIN rental_occupancy_ledger AS ledger ON ledger.product_id = entry.product_id
+            WHERE ledger.warehouse_id = %(warehouse_id)s AND
+                  ledger.date >= %(date_from)s AND ledger.date < %(date_to)s
+            GROUP BY entry.key
+        """, {
+            'keys': keys,
+            'product_ids': product_ids,
+            'own_froms': [own_from or None for own_from in own_froms],
+            'own_tos': [own_to or None for own_to in own_tos],
+            'own_qtys': own_qtys,
+            'warehouse_id': warehouse_id,
+            'date_from': date_from,
+            'date_to': date_to,
+        })
+        return dict(self._cr.fetchall())
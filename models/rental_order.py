@@ -5,13 +5,13 @@ from datetime import datetime, timedelta
 
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
-from dateutil.relativedelta import relativedelta
 
 _logger = logging.getLogger(__name__)
 
 class GdiRentalOrder(models.Model):
     _name = "gdi.rental.order"
-    _inherit = ["mail.thread", "mail.activity.mixin"]
+    _inherit = ["mail.thread", "mail.activity.mixin", "rental.period.mixin"]
+    _rental_line_field = "order_line"
     _description = "GDI Rental Order"
     _order = 'date_order, id desc'
 
@@ -134,6 +134,8 @@ class GdiRentalOrder(models.Model):
     duration_string = fields.Char(string="Duration Str", compute="_compute_duration_str")
 
     effective_end_date = fields.Date(string="Effective End Date")
+    expiry_notified_date = fields.Date(string="Expiry Notified For", readonly=True, copy=False,
+                                       help="End date the expiry activity was scheduled for.")
     contract_id = fields.Many2one("rental.contract", string="Active Contract")
     rental_contract_ids = fields.One2many("rental.contract", "order_id", string="Contracts Documents")
     rental_picking_ids = fields.One2many("stock.picking", "gdi_rental_id", string="RDO Documents")
@@ -153,37 +155,6 @@ class GdiRentalOrder(models.Model):
         for record in self:
             record.duration_string = f"{record.duration} {dict(self._fields['duration_unit'].selection).get(record.duration_unit, 'Not Defined')}"
 
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                # For hours, we need to handle it differently as Date fields don't have hours
-                # This is a simplified approach - you might need to convert to datetime if precision is critical
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-
-    @api.model
-    def _convert_to_days(self, duration, duration_unit):
-        """Convert any duration unit to approximate days for comparison"""
-        if duration_unit == 'hour':
-            return duration / 24
-        elif duration_unit == 'day':
-            return duration
-        elif duration_unit == 'week':
-            return duration * 7
-        elif duration_unit == 'month':
-            return duration * 30  # Approximation
-        return 0
-    
     # @api.onchange('duration', 'duration_unit')
     # def _onchange_header_duration(self):
     #     """Update all line durations when header duration changes"""
@@ -192,42 +163,68 @@ class GdiRentalOrder(models.Model):
     #             line.duration = self.duration
     #             line.duration_unit = self.duration_unit
 
-    @api.depends("order_line", "order_line.duration", "order_line.duration_unit")
-    def _compute_duration_from_lines(self):
-        for record in self:
-            record.update_header_duration()
-
-    def _inverse_duration(self):
-        # Just allow the fields to be editable.
-        pass    
-    
-    def update_header_duration(self):
-        """Update header duration based on longest line item"""
-        longest_days = 0
-        longest_duration = self.duration
-        longest_unit = self.duration_unit
-        
-        for line in self.order_line:
-            line_days = self._convert_to_days(line.duration, line.duration_unit)
-            if line_days > longest_days:
-                longest_days = line_days
-                longest_duration = line.duration
-                longest_unit = line.duration_unit
-        
-        self.duration = longest_duration
-        self.duration_unit = longest_unit
-
-
-    @api.model
-    def create(self, vals):
-        if vals.get('name', _('New')) == _('New'):
-            seq_date = None
-            if 'date_order' in vals:
-                seq_date = fields.Datetime.context_timestamp(self, fields.Datetime.to_datetime(vals['date_order']))
-            vals['name'] = "RO" + self.env['ir.sequence'].next_by_code('gdi.rental.order', sequence_date=seq_date) or _('New')
-        result = super(GdiRentalOrder, self).create(vals)
+    def init(self):
+        # Partial index used by the expiry scanner on ongoing orders.
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS gdi_rental_order_ongoing_end_date_idx
+            ON gdi_rental_order (COALESCE(effective_end_date, end_date)) WHERE state = 'ongoing'
+        """)
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        for vals in vals_list:
+            if vals.get('name', _('New')) == _('New'):
+                seq_date = None
+                if 'date_order' in vals:
+                    seq_date = fields.Datetime.context_timestamp(self, fields.Datetime.to_datetime(vals['date_order']))
+                vals['name'] = "RO" + self.env['ir.sequence'].next_by_code('gdi.rental.order', sequence_date=seq_date) or _('New')
+        result = super(GdiRentalOrder, self).create(vals_list)
         return result
 
+    def write(self, vals):
+        res = super(GdiRentalOrder, self).write(vals)
+        if 'start_date' in vals:
+            self._propagate_start_date_to_lines()
+        return res
+
+    def _propagate_start_date_to_lines(self):
+        """
+        Update the start, end and scheduled dates of the lines of order level
+        orders in a single SQL statement, instead of recomputing the three
+        fields line by line through the ORM.
+        """
+        orders = self.filtered(lambda order: order.date_definition_level == 'order' and order.start_date)
+        lines = orders.order_line
+        if not lines:
+            return
+
+        line_fields = ['start_date', 'end_date', 'scheduled_date']
+        Line = self.env['gdi.rental.order.line']
+        # The values are written below, drop the recomputations triggered by the header.
+        for fname in line_fields:
+            self.env.remove_to_compute(Line._fields[fname], lines)
+        self.flush(['start_date', 'date_definition_level'])
+        Line.flush(['order_id', 'duration', 'duration_unit'] + line_fields)
+
+        # Same arithmetic as rental.period.mixin._get_end_date: months are clamped
+        # to the end of month and hours only count once they add up to full days.
+        self._cr.execute("""
+            UPDATE gdi_rental_order_line AS line
+            SET start_date = o.start_date,
+                end_date = CASE line.duration_unit
+                    WHEN 'hour' THEN (o.start_date + COALESCE(line.duration, 0) * interval '1 hour')::date
+                    WHEN 'day' THEN (o.start_date + COALESCE(line.duration, 0) * interval '1 day')::date
+                    WHEN 'week' THEN (o.start_date + COALESCE(line.duration, 0) * interval '1 week')::date
+                    WHEN 'month' THEN (o.start_date + COALESCE(line.duration, 0) * interval '1 month')::date
+                END,
+                scheduled_date = o.start_date::timestamp,
+                write_uid = %(uid)s,
+                write_date = NOW() AT TIME ZONE 'UTC'
+            FROM gdi_rental_order AS o
+            WHERE line.order_id = o.id AND o.id IN %(order_ids)s
+        """, {'uid': self.env.uid, 'order_ids': tuple(orders.ids)})
+        Line.invalidate_cache(line_fields + ['write_uid', 'write_date'], lines.ids)
+
     @api.onchange('partner_id')
     def onchange_partner_id(self):
         """
@@ -265,10 +262,12 @@ class GdiRentalOrder(models.Model):
 
     @api.depends('order_line.tax_id', 'order_line.price_unit', 'amount_total', 'amount_untaxed')
     def _compute_tax_totals_json(self):
+        tax_memo = {}
+
         def compute_taxes(order_line):
             price = order_line.price_unit * (1 - (order_line.discount or 0.0) / 100.0)
             order = order_line.order_id
-            return order_line.tax_id._origin.compute_all(price, order.currency_id, order_line.product_uom_qty, product=order_line.product_id, partner=order.partner_shipping_id)
+            return order_line.tax_id._origin._rental_compute_all(tax_memo, price, order.currency_id, order_line.product_uom_qty, product=order_line.product_id, partner=order.partner_shipping_id)
 
         account_move = self.env['account.move']
         for order in self:
@@ -410,6 +409,7 @@ class GdiRentalOrder(models.Model):
         }
     
     def action_start_rental(self):
+        started_lines = self.env['gdi.rental.order.line']
         for rec in self:
             contract_vals = rec._prepare_rental_contract_vals(rec)
             contract_line_ids = []
@@ -421,6 +421,8 @@ class GdiRentalOrder(models.Model):
                     line._get_contract_line_vals()
                 ))
             contract_vals.update({'contract_line_ids': contract_line_ids})
+            # reserve the chosen lots/serial numbers before anything leaves the warehouse.
+            rec.order_line._allocate_rental_lots()
             contract_id = self.env['rental.contract'].create(contract_vals)
 
             if not contract_id:
@@ -434,414 +436,30 @@ class GdiRentalOrder(models.Model):
                 'effective_end_date': rec.end_date,
                 'contract_id': contract_id.id
             })
+            started_lines |= rec.order_line
+
+        # Commit the started lines to the occupancy ledger in one statement.
+        self.env['rental.occupancy.ledger']._sync_lines(started_lines, {
+            line.id: (line.start_date, line.end_date) for line in started_lines
+        })
 
     def action_hireoff(self):
         """
-        Process hire-off for the entire rental order.
-        Creates physical inventory to return all active rental items.
+        Process hire-off for the entire rental orders.
+        Creates grouped physical inventories to return all active rental items.
         """
+        active_lines = self.env['gdi.rental.order.line']
         for rec in self:
             # Validate there are active lines to hire-off
-            active_lines = rec.order_line.filtered(lambda x: x.rental_state == 'active')
-            if not active_lines:
+            rec_active_lines = rec.order_line.filtered(lambda x: x.rental_state == 'active')
+            if not rec_active_lines:
                 raise ValidationError(_("No active rental items found to hire-off."))
-            
-            # Find the rental physical inventory picking type
-            picking_type_id = self.env["stock.picking.type"].search(
-                [('name', '=', 'Rental Physical Inventory')], 
-                limit=1
-            )
-            if not picking_type_id:
-                raise ValidationError(
-                    _("Operation type 'Rental Physical Inventory' not found. "
-                    "Please contact your system administrator!")
-                )
-            
-            try:
-                # Create physical inventory for hire-off
-                physical_inventory_hireoff = rec._create_physical_inventory_hireoff(picking_type_id)
-                
-                # Update rental order state
-                rec.write({
-                    'state': 'hireoff',
-                    'hireoff_date': fields.Datetime.now(),
-                })
-                
-                # Update all active lines to hireoff state
-                active_lines.write({
-                    'rental_state': 'hireoff'
-                })
-                
-                # Log the hire-off action
-                rec.message_post(
-                    body=_("Rental order hired-off. Physical inventory created: %s") % 
-                        physical_inventory_hireoff.name
-                )
-                
-            except Exception as e:
-                _logger.error(f"Failed to process hire-off for order {rec.name}: {str(e)}")
-                raise ValidationError(
-                    _("Failed to process hire-off. Error: %s") % str(e)
-                )
-
-
-    def _create_physical_inventory_hireoff(self, picking_type_id):
-        """
-        Create physical inventory transfer for hire-off of active rental items.
-        
-        Args:
-            picking_type_id: stock.picking.type record for the hire-off operation
-            
-        Returns:
-            stock.picking: Created picking record
-            
-        Raises:
-            UserError: when picking creation or validation fails.
-        """
-        if not self or not self.order_line:
-            return self.env["stock.picking"]
-        
-        try:
-            # Build all move lines for active rental items
-            move_lines = self._create_hireoff_stock_moves(picking_type_id)
-            
-            if not move_lines:
-                raise UserError(_("No stock moves could be created for hire-off."))
-            
-            # Create picking with all moves at once
-            picking_vals = self._prepare_hireoff_picking_vals(picking_type_id, move_lines)
-            picking = self.env["stock.picking"].create(picking_vals)
-            
-            # Validate the picking
-            picking.button_validate()
-            
-            return picking
-            
-        except Exception as e:
-            _logger.error(f"Failed to create physical inventory for hire-off: {str(e)}")
-            raise UserError(
-                _("Failed to create physical inventory for hire-off. Error: %s") % str(e)
-            )
-
-
-    def _prepare_hireoff_picking_vals(self, picking_type_id, move_lines):
-        """
-        Prepare values for creating hire-off stock picking record.
-        
-        Args:
-            picking_type_id: stock.picking.type record
-            move_lines: list of move tuples to include
-            
-        Returns:
-            dict: Values for stock.picking creation
-        """
-        current_datetime = fields.Datetime.now()
-        
-        picking_vals = {
-            'partner_id': self.partner_id.id,
-            'contact_person_id': self.partner_id.id,
-            'picking_type_id': picking_type_id.id,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': picking_type_id.default_location_src_id.id,
-            'move_type': "direct",
-            'scheduled_date': current_datetime,
-            'date_deadline': current_datetime,
-            'origin': f"{self.name} - Hire-off (IN)",
-            'customer_po': self.customer_po_number,
-            'src_user_id': self.env.user.id,
-            'move_ids_without_package': move_lines,
-            'rental_id': self.id,
-        }
-        
-        return picking_vals
-
-
-    def _create_hireoff_stock_moves(self, picking_type_id):
-        """
-        Create stock move data for hire-off items.
-        Only processes lines with rental_state = 'active'.
-        Handles both regular items and set items with components.
-        
-        Args:
-            picking_type_id: stock.picking.type record
-            
-        Returns:
-            list: List of tuples for creating stock moves
-        """
-        current_datetime = fields.Datetime.now()
-        move_lines = []
-        sq_no = 0
-        
-        # Filter only active rental lines
-        active_lines = self.order_line.filtered(lambda x: x.rental_state == 'active')
-        
-        for line in active_lines:
-            sq_no += 1
-            
-            prev_picking = self._get_hireoff_previous_picking(line)
-            if not prev_picking:
-                _logger.warning(f"No previous picking found for hire-off line: {line.name}")
-                continue
-            
-            if line.item_type == 'set' and line.component_line_ids:
-                # Handle set items with components
-                component_moves = self._prepare_hireoff_set_component_moves(
-                    line, picking_type_id, prev_picking,
-                    sq_no, current_datetime
-                )
-                move_lines.extend(component_moves)
-            else:
-                # Handle regular unit items
-                move_data = self._prepare_hireoff_stock_move(
-                    line, picking_type_id, prev_picking,
-                    sq_no, current_datetime
-                )
-                if move_data:
-                    move_lines.append(move_data)
-        
-        return move_lines
-
-
-    def _get_hireoff_previous_picking(self, line):
-        """
-        Get the previous picking/move for a hire-off line.
-        
-        Args:
-            line: rental order line record
-            
-        Returns:
-            stock.move: Previous stock move or False
-        """
-        if not line.stock_move_ids:
-            return False
-        
-        # Get the last move (most recent outgoing move)
-        moves = line.stock_move_ids.sorted(key=lambda m: m.date, reverse=True)
-        return moves[0] if moves else False
-
-
-    def _prepare_hireoff_set_component_moves(self, line, picking_type_id,
-                                            prev_picking, sequence, current_datetime):
-        """
-        Prepare hire-off move data for all components in a set.
-        
-        Args:
-            line: rental order line record (set item)
-            picking_type_id: stock.picking.type record
-            prev_picking: previous stock.move record
-            sequence: base sequence number for the set
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating component moves
-        """
-        component_moves = []
-        component_seq = 0
-        
-        for component in line.component_line_ids:
-            component_seq += 1
-            
-            prev_component_move = self._find_hireoff_component_previous_move(
-                component, prev_picking
-            )
-            
-            if not prev_component_move:
-                _logger.warning(
-                    f"No previous move found for component {component.product_id.name} "
-                    f"in set {line.name}"
-                )
-                continue
-            
-            move_data = self._prepare_hireoff_component_move(
-                line, component, picking_type_id,
-                prev_component_move, sequence, component_seq, current_datetime
-            )
-            
-            if move_data:
-                component_moves.append(move_data)
-        
-        return component_moves
-
-
-    def _find_hireoff_component_previous_move(self, component, prev_picking):
-        """
-        Find the previous stock move for a specific component.
-        
-        Args:
-            component: component line record
-            prev_picking: previous stock.move or stock.picking record
-            
-        Returns:
-            stock.move: Previous move for this component or False
-        """
-        # If prev_picking is a stock.move, get its picking
-        if prev_picking._name == 'stock.move':
-            picking = prev_picking.picking_id
-        else:
-            picking = prev_picking
-        
-        if not picking:
-            return False
-        
-        # Search for move with matching product
-        component_move = picking.move_lines.filtered(
-            lambda m: m.product_id.id == component.product_id.id
-        )
-        
-        return component_move[0] if component_move else False
-
-
-    def _prepare_hireoff_component_move(self, set_line, component,
-                                        picking_type_id, prev_component_move,
-                                        set_sequence, component_sequence, current_datetime):
-        """
-        Prepare hire-off stock move data for a single set component.
-        
-        Args:
-            set_line: rental order line record (parent set)
-            component: component line record
-            picking_type_id: stock.picking.type record
-            prev_component_move: previous stock.move for this component
-            set_sequence: sequence number of the parent set
-            component_sequence: sequence number within components
-            current_datetime: current datetime
-            
-        Returns:
-            tuple: Move data tuple (0, 0, dict) for creation
-        """
-        # Prepare move lines with lot tracking for the component
-        move_line_vals = self._prepare_hireoff_component_move_lines(
-            component, prev_component_move, picking_type_id, current_datetime
-        )
-        
-        # Use component details for the move
-        product = component.product_id
-        name = product.product_name or product.name or component.name
-        
-        # Prepare main move values
-        move_vals = {
-            'sequence_number': set_sequence + (component_sequence * 0.01),
-            'name': f"{set_line.name} - {name}",
-            'description_picking': name,
-            'product_id': product.id,
-            'product_uom': component.product_uom.id,
-            'product_uom_qty': component.product_uom_qty,
-            'date': current_datetime,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': prev_component_move.location_id.id,
-            'move_line_ids': move_line_vals,
-        }
-        
-        return (0, 0, move_vals)
-
-
-    def _prepare_hireoff_component_move_lines(self, component, prev_component_move,
-                                            picking_type_id, current_datetime):
-        """
-        Prepare detailed move lines for component hire-off with lot/serial tracking.
-        
-        Args:
-            component: component line record
-            prev_component_move: previous stock.move record for this component
-            picking_type_id: stock.picking.type record
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating stock.move.line records
-        """
-        move_lines = []
-        
-        if not prev_component_move.move_line_ids:
-            return move_lines
-        
-        for moveline in prev_component_move.move_line_ids:
-            move_line_vals = {
-                'product_id': component.product_id.id,
-                'product_uom_id': component.product_uom.id,
-                'product_uom_qty': moveline.qty_done,
-                'qty_done': moveline.qty_done,
-                'date': current_datetime,
-                'location_id': picking_type_id.default_location_dest_id.id,
-                'location_dest_id': prev_component_move.location_id.id,
-                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
-            }
-            move_lines.append((0, 0, move_line_vals))
-        
-        return move_lines
-
-
-    def _prepare_hireoff_stock_move(self, line, picking_type_id,
-                                    prev_picking, sequence, current_datetime):
-        """
-        Prepare hire-off stock move data with detailed move lines.
-        (For non-set items)
-        
-        Args:
-            line: rental order line record
-            picking_type_id: stock.picking.type record
-            prev_picking: previous stock.move record
-            sequence: sequence number for the move
-            current_datetime: current datetime
-            
-        Returns:
-            tuple: Move data tuple (0, 0, dict) for creation
-        """
-        # Prepare move lines with lot tracking
-        move_line_vals = self._prepare_hireoff_move_lines(
-            line, prev_picking, picking_type_id, current_datetime
-        )
-        
-        # Prepare main move values
-        move_vals = {
-            'sequence_number': sequence,
-            'name': line.name,
-            'description_picking': line.name,
-            'product_id': line.product_id.id,
-            'product_uom': line.product_uom.id,
-            'product_uom_qty': line.product_uom_qty,
-            'date': current_datetime,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': prev_picking.location_id.id,
-            'move_line_ids': move_line_vals,
-        }
-        
-        return (0, 0, move_vals)
-
-
-    def _prepare_hireoff_move_lines(self, line, prev_picking, picking_type_id, current_datetime):
-        """
-        Prepare detailed move lines with lot/serial tracking from previous picking.
-        (For non-set items)
-        
-        Args:
-            line: rental order line record
-            prev_picking: previous stock.move record
-            picking_type_id: stock.picking.type record
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating stock.move.line records
-        """
-        move_lines = []
-        
-        if not prev_picking.move_line_ids:
-            return move_lines
-        
-        for moveline in prev_picking.move_line_ids:
-            move_line_vals = {
-                'product_id': line.product_id.id,
-                'product_uom_id': line.product_uom.id,
-                'product_uom_qty': moveline.qty_done,
-                'qty_done': moveline.qty_done,
-                'date': current_datetime,
-                'location_id': picking_type_id.default_location_dest_id.id,
-                'location_dest_id': prev_picking.location_id.id,
-                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
-            }
-            move_lines.append((0, 0, move_line_vals))
-        
-        return move_lines
+            active_lines |= rec_active_lines
 
+        wizard = self.env['rental.bulk.hireoff.wizard'].create({
+            'line_ids': [(6, 0, active_lines.ids)],
+        })
+        wizard._process_hireoff()
 
     def open_related_contract(self):
         for rec in self:
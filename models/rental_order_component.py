@@ -32,6 +32,7 @@ class RentalQuotationComponent(models.Model):
     src_location_id = fields.Many2one("stock.location", string="Source Location")
     available_src_location_ids = fields.Many2many("stock.location", string="Src Location Ids", compute="_get_available_src_location")
     available_src_location_txt = fields.Text("Available Src Location", compute="_get_available_src_location")
+    available_src_location_json = fields.Text("Available Src Location Data", compute="_get_available_src_location")
     lot_id = fields.Many2one("stock.production.lot", domain=[('product_id', '=', product_id)])
 
     quotation_duration = fields.Integer(string="Duration", related="quotation_line_id.duration")
@@ -129,18 +130,7 @@ class RentalQuotationComponent(models.Model):
 
     @api.depends('product_id', 'src_location_id')
     def _get_available_qty(self):
-        for rec in self:
-            rec.available_qty = 0
-            if rec.product_id and rec.src_location_id:
-                quant_query = """
-                    SELECT SUM(quantity) AS total_qty FROM stock_quant
-                    WHERE location_id = %s AND product_id = %s 
-                """
-                self._cr.execute(quant_query, (rec.src_location_id.id, rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                if results:
-                    for stock in results:
-                        rec.available_qty = stock['total_qty']
+        self.env['rental.stock.availability']._fill_available_qty(self)
 
     @api.depends('product_uom_qty', 'price_unit')
     def _compute_amount(self):
@@ -155,34 +145,7 @@ class RentalQuotationComponent(models.Model):
     
     @api.depends('product_id')
     def _get_available_src_location(self):
-        for rec in self:
-            if not rec.product_id:
-                rec.available_src_location_txt = '-'
-                rec.available_src_location_ids = False
-            else:
-                quant_query = """
-                    SELECT loc.id AS location_id, SUM(quant.quantity) AS total_qty FROM stock_quant AS quant, stock_location AS loc
-                    WHERE loc.usage = 'internal' AND
-                          quant.location_id = loc.id AND
-                          quant.quantity != 0.0 AND
-                          quant.product_id = %s GROUP BY loc.id
-                """
-                self._cr.execute(quant_query, (rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                rec.available_src_location_txt = 'N/A'
-                if len(results) > 0:
-                    avail_stock_qty_txt = ''
-                    location_ids = []
-                    for stock in results:
-                        location_id = self.env['stock.location'].browse(stock['location_id'])
-                        location_ids.append(location_id.id)
-                        availstock_location_text = '{} ({}) \n'.format(location_id.display_name, str(stock['total_qty']))
-                        avail_stock_qty_txt += availstock_location_text
-                    rec.available_src_location_txt = avail_stock_qty_txt
-                    rec.available_src_location_ids = self.env['stock.location'].browse(location_ids)
-                else:
-                    rec.available_src_location_txt = 'N/A'
-                    rec.available_src_location_ids = False
+        self.env['rental.stock.availability']._fill_available_src_location(self)
 
     @api.onchange('product_id')
     def product_id_change(self):
@@ -191,7 +154,7 @@ class RentalQuotationComponent(models.Model):
         self.update({'name': self.product_id.display_name})
         vals = {}
         if not self.product_uom or (self.product_id.uom_id.id != self.product_uom.id):
-            rental_pricing_list = self._get_rental_pricing_list(self.product_id)
+            rental_pricing_list = self.product_id._get_rental_pricing_list()
             if not rental_pricing_list:
                 raise ValidationError(
                     "Rental price for the selected duration (%s) is not configured for this product. Please contact the administrator or choose different duration." % (self.quotation_duration_unit)
@@ -210,19 +173,13 @@ class RentalQuotationComponent(models.Model):
         vals['src_location_id'] = False
         self.update(vals)
 
-    def _get_rental_pricing_list(self, product):
-        if not product or not product.rental_pricing_ids:
-            return False
-        
-        return {price.unit: price.price for price in product.rental_pricing_ids}
-    
 
 class RentalOrderComponent(models.Model):
     _name = "rental.order.component"
     _description = "Rental Order Components"
 
 
-    order_line_id = fields.Many2one("gdi.rental.order.line", string="Order Item Ref.")
+    order_line_id = fields.Many2one("gdi.rental.order.line", string="Order Item Ref.", index=True)
     product_id = fields.Many2one("product.product", required=True, string="Product", domain=[('rent_ok', '=', True), ('detailed_type', '=', 'product')])
     name = fields.Text(string='Description', required=True)
     product_uom_qty = fields.Float(string='Quantity', digits='Product Unit of Measure', required=True, default=1.0)
@@ -242,6 +199,7 @@ class RentalOrderComponent(models.Model):
     src_location_id = fields.Many2one("stock.location", string="Source Location")
     available_src_location_ids = fields.Many2many("stock.location", string="Src Location Ids", compute="_get_available_src_location")
     available_src_location_txt = fields.Text("Available Src Location", compute="_get_available_src_location")
+    available_src_location_json = fields.Text("Available Src Location Data", compute="_get_available_src_location")
     lot_id = fields.Many2one("stock.production.lot", domain=[('product_id', '=', product_id)])
 
     duration = fields.Integer(string="Duration", related="order_line_id.duration")
@@ -292,6 +250,8 @@ class RentalOrderComponent(models.Model):
     )
 
     stock_move_ids = fields.One2many("stock.move", "rental_order_component_id", string="Stock Moves")
+    last_out_move_id = fields.Many2one("stock.move", string="Last Outgoing Move", readonly=True, copy=False, index=True)
+    last_in_move_id = fields.Many2one("stock.move", string="Last Incoming Move", readonly=True, copy=False, index=True)
 
     @api.depends('order_line_id.warehouse_id', 'order_line_id.company_id')
     def _compute_warehouse_id(self):
@@ -341,18 +301,7 @@ class RentalOrderComponent(models.Model):
 
     @api.depends('product_id', 'src_location_id')
     def _get_available_qty(self):
-        for rec in self:
-            rec.available_qty = 0
-            if rec.product_id and rec.src_location_id:
-                quant_query = """
-                    SELECT SUM(quantity) AS total_qty FROM stock_quant
-                    WHERE location_id = %s AND product_id = %s 
-                """
-                self._cr.execute(quant_query, (rec.src_location_id.id, rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                if results:
-                    for stock in results:
-                        rec.available_qty = stock['total_qty']
+        self.env['rental.stock.availability']._fill_available_qty(self)
 
     @api.depends('product_uom_qty', 'price_unit')
     def _compute_amount(self):
@@ -367,34 +316,7 @@ class RentalOrderComponent(models.Model):
     
     @api.depends('product_id')
     def _get_available_src_location(self):
-        for rec in self:
-            if not rec.product_id:
-                rec.available_src_location_txt = '-'
-                rec.available_src_location_ids = False
-            else:
-                quant_query = """
-                    SELECT loc.id AS location_id, SUM(quant.quantity) AS total_qty FROM stock_quant AS quant, stock_location AS loc
-                    WHERE loc.usage = 'internal' AND
-                          quant.location_id = loc.id AND
-                          quant.quantity != 0.0 AND
-                          quant.product_id = %s GROUP BY loc.id
-                """
-                self._cr.execute(quant_query, (rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                rec.available_src_location_txt = 'N/A'
-                if len(results) > 0:
-                    avail_stock_qty_txt = ''
-                    location_ids = []
-                    for stock in results:
-                        location_id = self.env['stock.location'].browse(stock['location_id'])
-                        location_ids.append(location_id.id)
-                        availstock_location_text = '{} ({}) \n'.format(location_id.display_name, str(stock['total_qty']))
-                        avail_stock_qty_txt += availstock_location_text
-                    rec.available_src_location_txt = avail_stock_qty_txt
-                    rec.available_src_location_ids = self.env['stock.location'].browse(location_ids)
-                else:
-                    rec.available_src_location_txt = 'N/A'
-                    rec.available_src_location_ids = False
+        self.env['rental.stock.availability']._fill_available_src_location(self)
 
     @api.onchange('product_id')
     def product_id_change(self):
@@ -403,7 +325,7 @@ class RentalOrderComponent(models.Model):
         self.update({'name': self.product_id.display_name})
         vals = {}
         if not self.product_uom or (self.product_id.uom_id.id != self.product_uom.id):
-            rental_pricing_list = self._get_rental_pricing_list(self.product_id)
+            rental_pricing_list = self.product_id._get_rental_pricing_list()
             rental_price = rental_pricing_list[self.duration_unit] * self.duration
             vals['product_uom'] = self.product_id.uom_id
             vals['price_unit'] = rental_price
@@ -411,18 +333,33 @@ class RentalOrderComponent(models.Model):
         vals['src_location_id'] = False
         self.update(vals)
 
-    def _get_rental_pricing_list(self, product):
-        if not product or not product.rental_pricing_ids:
-            return False
-        
-        return {price.unit: price.price for price in product.rental_pricing_ids}
+    def _get_last_out_move_map(self):
+        """
+        Get the move that last delivered each component, resolved for all
+        components at once through the stored pointer or a single search.
+
+        Returns:
+            dict: {component_id: stock.move}, components never delivered are omitted
+        """
+        move_map = {comp.id: comp.last_out_move_id for comp in self if comp.last_out_move_id}
+        missing = self.filtered(lambda comp: comp.id not in move_map)
+        if missing:
+            moves = self.env['stock.move'].search([
+                ('rental_order_component_id', 'in', missing.ids),
+                ('rental_order_item_id', '!=', False),
+                ('state', '!=', 'cancel'),
+            ], order='date desc, id desc')
+            for move in moves:
+                move_map.setdefault(move.rental_order_component_id.id, move)
+        return move_map
+
     
 class RentalContractComponent(models.Model):
     _name = "rental.contract.component"
     _description = "Rental Contract Components"
 
 
-    contract_line_id = fields.Many2one("rental.contract.line", string="Contract Item Ref.")
+    contract_line_id = fields.Many2one("rental.contract.line", string="Contract Item Ref.", index=True)
     product_id = fields.Many2one("product.product", required=True, string="Product", domain=[('rent_ok', '=', True), ('detailed_type', '=', 'product')])
     name = fields.Text(string='Description', required=True)
     product_uom_qty = fields.Float(string='Quantity', digits='Product Unit of Measure', required=True, default=1.0)
@@ -442,6 +379,7 @@ class RentalContractComponent(models.Model):
     src_location_id = fields.Many2one("stock.location", string="Source Location")
     available_src_location_ids = fields.Many2many("stock.location", string="Src Location Ids", compute="_get_available_src_location")
     available_src_location_txt = fields.Text("Available Src Location", compute="_get_available_src_location")
+    available_src_location_json = fields.Text("Available Src Location Data", compute="_get_available_src_location")
     lot_id = fields.Many2one("stock.production.lot", domain=[('product_id', '=', product_id)])
 
     duration = fields.Integer(string="Duration", related="contract_line_id.duration")
@@ -539,18 +477,7 @@ class RentalContractComponent(models.Model):
 
     @api.depends('product_id', 'src_location_id')
     def _get_available_qty(self):
-        for rec in self:
-            rec.available_qty = 0
-            if rec.product_id and rec.src_location_id:
-                quant_query = """
-                    SELECT SUM(quantity) AS total_qty FROM stock_quant
-                    WHERE location_id = %s AND product_id = %s 
-                """
-                self._cr.execute(quant_query, (rec.src_location_id.id, rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                if results:
-                    for stock in results:
-                        rec.available_qty = stock['total_qty']
+        self.env['rental.stock.availability']._fill_available_qty(self)
 
     @api.depends('product_uom_qty', 'price_unit')
     def _compute_amount(self):
@@ -565,34 +492,7 @@ class RentalContractComponent(models.Model):
     
     @api.depends('product_id')
     def _get_available_src_location(self):
-        for rec in self:
-            if not rec.product_id:
-                rec.available_src_location_txt = '-'
-                rec.available_src_location_ids = False
-            else:
-                quant_query = """
-                    SELECT loc.id AS location_id, SUM(quant.quantity) AS total_qty FROM stock_quant AS quant, stock_location AS loc
-                    WHERE loc.usage = 'internal' AND
-                          quant.location_id = loc.id AND
-                          quant.quantity != 0.0 AND
-                          quant.product_id = %s GROUP BY loc.id
-                """
-                self._cr.execute(quant_query, (rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                rec.available_src_location_txt = 'N/A'
-                if len(results) > 0:
-                    avail_stock_qty_txt = ''
-                    location_ids = []
-                    for stock in results:
-                        location_id = self.env['stock.location'].browse(stock['location_id'])
-                        location_ids.append(location_id.id)
-                        availstock_location_text = '{} ({}) \n'.format(location_id.display_name, str(stock['total_qty']))
-                        avail_stock_qty_txt += availstock_location_text
-                    rec.available_src_location_txt = avail_stock_qty_txt
-                    rec.available_src_location_ids = self.env['stock.location'].browse(location_ids)
-                else:
-                    rec.available_src_location_txt = 'N/A'
-                    rec.available_src_location_ids = False
+        self.env['rental.stock.availability']._fill_available_src_location(self)
 
     @api.onchange('product_id')
     def product_id_change(self):
@@ -601,16 +501,10 @@ class RentalContractComponent(models.Model):
         self.update({'name': self.product_id.display_name})
         vals = {}
         if not self.product_uom or (self.product_id.uom_id.id != self.product_uom.id):
-            rental_pricing_list = self._get_rental_pricing_list(self.product_id)
+            rental_pricing_list = self.product_id._get_rental_pricing_list()
             rental_price = rental_pricing_list[self.duration_unit] * self.duration
             vals['product_uom'] = self.product_id.uom_id
             vals['price_unit'] = rental_price
             vals['product_uom_qty'] = self.product_uom_qty or 1.0
         vals['src_location_id'] = False
         self.update(vals)
-
-    def _get_rental_pricing_list(self, product):
-        if not product or not product.rental_pricing_ids:
-            return False
-        
-        return {price.unit: price.price for price in product.rental_pricing_ids}
\ No newline at end of file
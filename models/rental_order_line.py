@@ -1,17 +1,22 @@
 # -*- coding: utf-8 -*-
 
 
+import json
+import logging
 from datetime import timedelta
 
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.tools.misc import get_lang
 
-from dateutil.relativedelta import relativedelta
+_logger = logging.getLogger(__name__)
 
 class GDIRentalOrderLine(models.Model):
     _name = 'gdi.rental.order.line'
     _description = 'Rental Order Line'
+    _inherit = ["rental.period.mixin", "rental.period.overlap.mixin"]
+    _rental_component_model = "rental.order.component"
+    _rental_component_field = "order_line_id"
     _order = 'order_id, sequence, id'
 
     order_id = fields.Many2one('gdi.rental.order', string='RO Reference', required=True,
@@ -21,7 +26,7 @@ class GDIRentalOrderLine(models.Model):
     item_code = fields.Char(string="Item Code", required=True)
     product_id = fields.Many2one('product.product', string='Product', 
                                  domain="[('sale_ok', '=', True), '|', ('company_id', '=', False), ('company_id', '=', company_id)]",
-                                 change_default=True, ondelete='restrict')  # Unrequired company
+                                 change_default=True, ondelete='restrict', index=True)  # Unrequired company
     product_template_id = fields.Many2one(
         'product.template', string='Product Template',
         related="product_id.product_tmpl_id", domain=[('sale_ok', '=', True)])
@@ -64,9 +69,13 @@ class GDIRentalOrderLine(models.Model):
     ], string="Unit", required=True)
 
     available_qty = fields.Float(string="Available Qty", compute="_get_available_qty")
+    rental_free_qty = fields.Float(string="Free Over Period", compute="_get_rental_free_qty",
+                                   help="Quantity on hand in the warehouse minus the peak quantity committed "
+                                        "by other rentals between the start and end date of the line.")
     src_location_id = fields.Many2one("stock.location", string="Source Location")
     available_src_location_ids = fields.Many2many("stock.location", string="Src Location Ids", compute="_get_available_src_location")
-    available_src_location_txt = fields.Text("Available Src Location", compute="_get_available_src_location")    
+    available_src_location_txt = fields.Text("Available Src Location", compute="_get_available_src_location")
+    available_src_location_json = fields.Text("Available Src Location Data", compute="_get_available_src_location")
     
     component_line_ids = fields.One2many("rental.order.component", 
                                          "order_line_id", 
@@ -82,6 +91,14 @@ class GDIRentalOrderLine(models.Model):
         ('active', 'Active'),
         ('hireoff', 'Hired-Off')
     ], string="Rental Status", default="draft")
+    occupancy_start_date = fields.Date(string="Occupancy Start", readonly=True, copy=False,
+                                       help="Start of the period committed in the rental occupancy ledger.")
+    occupancy_end_date = fields.Date(string="Occupancy End", readonly=True, copy=False,
+                                     help="End (exclusive) of the period committed in the rental occupancy ledger.")
+    occupancy_warehouse_id = fields.Many2one("stock.warehouse", string="Occupancy Warehouse", readonly=True, copy=False,
+                                             help="Warehouse of the period committed in the rental occupancy ledger.")
+    occupancy_qty_json = fields.Text(string="Occupancy Quantities", readonly=True, copy=False,
+                                     help="Quantities committed in the rental occupancy ledger, as [[product_id, qty], ...].")
 
     # Fields for forecast widget
     product_type = fields.Selection(related='product_id.type', string="Product Type")
@@ -158,6 +175,15 @@ class GDIRentalOrderLine(models.Model):
         help='Quick stock information display'
     )
     stock_move_ids = fields.One2many("stock.move", "ro_line_id", string="Stock Moves")
+    last_out_move_id = fields.Many2one("stock.move", string="Last Outgoing Move", readonly=True, copy=False, index=True)
+    last_in_move_id = fields.Many2one("stock.move", string="Last Incoming Move", readonly=True, copy=False, index=True)
+
+    def init(self):
+        super(GDIRentalOrderLine, self).init()
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS gdi_rental_order_line_active_end_date_idx
+            ON gdi_rental_order_line (end_date) WHERE rental_state = 'active'
+        """)
 
     @api.depends('duration', 'duration_unit')
     def _compute_duration_str(self):
@@ -190,22 +216,6 @@ class GDIRentalOrderLine(models.Model):
     def _inverse_start_date(self):
         pass
     
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-
     def _inverse_end_date(self):
         pass
 
@@ -214,9 +224,10 @@ class GDIRentalOrderLine(models.Model):
         """
         Compute the amounts of the SO line.
         """
+        tax_memo = {}
         for line in self:
             price = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
-            taxes = line.tax_id.compute_all(price, line.order_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.order_id.partner_shipping_id)
+            taxes = line.tax_id._rental_compute_all(tax_memo, price, line.order_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.order_id.partner_shipping_id)
             line.update({
                 'price_tax': sum(t.get('amount', 0.0) for t in taxes.get('taxes', [])),
                 'price_total': taxes['total_included'],
@@ -225,49 +236,15 @@ class GDIRentalOrderLine(models.Model):
 
     @api.depends('product_id', 'src_location_id')
     def _get_available_qty(self):
-        for rec in self:
-            rec.available_qty = 0
-            if rec.product_id and rec.src_location_id:
-                quant_query = """
-                    SELECT SUM(quantity) AS total_qty FROM stock_quant
-                    WHERE location_id = %s AND product_id = %s 
-                """
-                self._cr.execute(quant_query, (rec.src_location_id.id, rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                if results:
-                    for stock in results:
-                        rec.available_qty = stock['total_qty']
+        self.env['rental.stock.availability']._fill_available_qty(self)
     
     @api.depends('product_id')
     def _get_available_src_location(self):
-        for rec in self:
-            if not rec.product_id:
-                rec.available_src_location_txt = '-'
-                rec.available_src_location_ids = False
-            else:
-                quant_query = """
-                    SELECT loc.id AS location_id, SUM(quant.quantity) AS total_qty FROM stock_quant AS quant, stock_location AS loc
-                    WHERE loc.usage = 'internal' AND
-                          quant.location_id = loc.id AND
-                          quant.quantity != 0.0 AND
-                          quant.product_id = %s GROUP BY loc.id
-                """
-                self._cr.execute(quant_query, (rec.product_id.id, ))
-                results = self._cr.dictfetchall()
-                rec.available_src_location_txt = 'N/A'
-                if len(results) > 0:
-                    avail_stock_qty_txt = ''
-                    location_ids = []
-                    for stock in results:
-                        location_id = self.env['stock.location'].browse(stock['location_id'])
-                        location_ids.append(location_id.id)
-                        availstock_location_text = '{} ({}) \n'.format(location_id.display_name, str(stock['total_qty']))
-                        avail_stock_qty_txt += availstock_location_text
-                    rec.available_src_location_txt = avail_stock_qty_txt
-                    rec.available_src_location_ids = self.env['stock.location'].browse(location_ids)
-                else:
-                    rec.available_src_location_txt = 'N/A'
-                    rec.available_src_location_ids = False
+        self.env['rental.stock.availability']._fill_available_src_location(self)
+
+    @api.depends('product_id', 'product_uom_qty', 'warehouse_id', 'start_date', 'end_date')
+    def _get_rental_free_qty(self):
+        self.env['rental.stock.availability']._fill_rental_free_qty(self)
 
     # Stock Forecast Methods
     @api.depends('product_id')
@@ -488,7 +465,7 @@ class GDIRentalOrderLine(models.Model):
         )
 
         if self.order_id.pricelist_id and self.order_id.partner_id:
-            rental_pricing_list = self._get_rental_pricing_list(product)
+            rental_pricing_list = product._get_rental_pricing_list()
             if not rental_pricing_list:
                 raise ValidationError(
                     "Rental price for the selected duration (%s) is not configured for this product. Please contact the administrator or choose different duration." % (self.duration_unit)
@@ -514,12 +491,6 @@ class GDIRentalOrderLine(models.Model):
 
         self.update(vals)
 
-    def _get_rental_pricing_list(self, product):
-        if not product or not product.rental_pricing_ids:
-            return False
-        
-        return {price.unit: price.price for price in product.rental_pricing_ids}
-    
     @api.onchange('component_line_ids')
     def onchange_component_line_ids(self):
         for rec in self:
@@ -537,6 +508,191 @@ class GDIRentalOrderLine(models.Model):
             if not rec.end_date:
                 raise ValidationError(_(f"Rental period end date for item code {rec.item_code} is not defined. Please define it before starting the rental."))
 
+    def _get_occupancy_quantities(self):
+        """
+        Get the quantities this line commits in the rental occupancy ledger.
+
+        Returns:
+            list: List of (product_id, qty) tuples, one per component for set items
+        """
+        self.ensure_one()
+        if self.item_type == 'set':
+            return [
+                (comp.product_id.id, comp.product_uom_qty)
+                for comp in self.component_line_ids if comp.product_id
+            ]
+        if not self.product_id:
+            return []
+        return [(self.product_id.id, self.product_uom_qty)]
+
+    def _get_committed_occupancy_quantities(self):
+        """
+        Get the quantities this line actually committed in the rental occupancy
+        ledger, whatever changed on the line since.
+
+        Returns:
+            list: List of (product_id, qty) tuples
+        """
+        self.ensure_one()
+        if not self.occupancy_qty_json:
+            # Commitments made before the quantities were stored.
+            return self._get_occupancy_quantities() if self.occupancy_start_date else []
+        return [(product_id, qty) for product_id, qty in json.loads(self.occupancy_qty_json)]
+
+    def _release_occupancy(self, release_date):
+        """
+        Shorten the committed occupancy of hired-off lines so that it ends on
+        ``release_date``.
+        """
+        periods = {}
+        for line in self:
+            date_from, date_to = line.occupancy_start_date, line.occupancy_end_date
+            if not date_from or not date_to:
+                continue
+            if release_date <= date_from:
+                periods[line.id] = (False, False)
+            else:
+                periods[line.id] = (date_from, min(date_to, release_date))
+        lines = self.filtered(lambda line: line.id in periods)
+        self.env['rental.occupancy.ledger']._sync_lines(lines, periods, keep_quantities=True)
+
+    def _get_last_out_move_map(self):
+        """
+        Get the move that last delivered each line, resolved for all lines at
+        once through the stored pointer or a single search.
+
+        Returns:
+            dict: {line_id: stock.move}, lines never delivered are omitted
+        """
+        move_map = {line.id: line.last_out_move_id for line in self if line.last_out_move_id}
+        missing = self.filtered(lambda line: line.id not in move_map)
+        if missing:
+            moves = self.env['stock.move'].search([
+                ('ro_line_id', 'in', missing.ids),
+                ('rental_order_item_id', '!=', False),
+                ('state', '!=', 'cancel'),
+            ], order='date desc, id desc')
+            for move in moves:
+                move_map.setdefault(move.ro_line_id.id, move)
+        return move_map
+
+    def _prepare_return_moves_vals(self, picking_type_id):
+        """
+        Prepare the moves returning the lines from the customer, in one pass
+        over all lines. Every move mirrors the move that last delivered the
+        line (or set component), lots included.
+
+        Args:
+            picking_type_id: stock.picking.type record of the return operation
+
+        Returns:
+            list: List of tuples for creating stock moves
+        """
+        current_datetime = fields.Datetime.now()
+        location_id = picking_type_id.default_location_dest_id.id
+        line_moves = self._get_last_out_move_map()
+        component_moves = self.component_line_ids._get_last_out_move_map()
+
+        # Prefetch the delivered move lines and their lots for every line at once.
+        prev_moves = self.env['stock.move'].concat(*line_moves.values(), *component_moves.values())
+        prev_moves.move_line_ids.mapped('lot_id')
+
+        def prepare_move_lines(prev_move, product, uom):
+            return [(0, 0, {
+                'product_id': product.id,
+                'product_uom_id': uom.id,
+                'product_uom_qty': moveline.qty_done,
+                'qty_done': moveline.qty_done,
+                'date': current_datetime,
+                'location_id': location_id,
+                'location_dest_id': prev_move.location_id.id,
+                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
+            }) for moveline in prev_move.move_line_ids]
+
+        move_lines = []
+        sq_no = 0
+        for line in self:
+            sq_no += 1
+
+            prev_move = line_moves.get(line.id)
+            if not prev_move:
+                _logger.warning(f"No previous picking found for rental return line: {line.name}")
+                continue
+
+            if line.item_type == 'set' and line.component_line_ids:
+                component_seq = 0
+                for component in line.component_line_ids:
+                    component_seq += 1
+                    prev_component_move = component_moves.get(component.id)
+                    if not prev_component_move:
+                        _logger.warning(
+                            f"No previous move found for component {component.product_id.name} "
+                            f"in set {line.name}"
+                        )
+                        continue
+
+                    product = component.product_id
+                    name = product.product_name or product.name or component.name
+                    move_lines.append((0, 0, {
+                        'sequence_number': sq_no + (component_seq * 0.01),  # e.g., 1.01, 1.02
+                        'name': f"{line.name} - {name}",
+                        'description_picking': name,
+                        'product_id': product.id,
+                        'product_uom': component.product_uom.id,
+                        'product_uom_qty': prev_component_move.product_uom_qty,
+                        'date': current_datetime,
+                        'location_id': location_id,
+                        'location_dest_id': prev_component_move.location_id.id,
+                        'move_line_ids': prepare_move_lines(prev_component_move, product, component.product_uom),
+                        'ro_line_id': line.id,
+                        'rental_order_component_id': component.id,
+                    }))
+            else:
+                move_lines.append((0, 0, {
+                    'sequence_number': sq_no,
+                    'name': line.name,
+                    'description_picking': line.name,
+                    'product_id': line.product_id.id,
+                    'product_uom': line.product_uom.id,
+                    'product_uom_qty': prev_move.product_uom_qty,
+                    'date': current_datetime,
+                    'location_id': location_id,
+                    'location_dest_id': prev_move.location_id.id,
+                    'move_line_ids': prepare_move_lines(prev_move, line.product_id, line.product_uom),
+                    'ro_line_id': line.id,
+                }))
+
+        return move_lines
+
+    def _get_rental_inventory_type(self):
+        """Get the operation type used to return the line to the warehouse."""
+        self.ensure_one()
+        return self.env['stock.warehouse']._get_rental_picking_type(
+            'inventory', company=self.company_id, warehouse=self.warehouse_id
+        )
+
+    def _allocate_rental_lots(self):
+        """
+        Allocate the lots/serial numbers chosen on the components of the lines
+        over their rental period. Overlaps are rejected by the database.
+        """
+        vals_list = []
+        for line in self:
+            for comp in line.component_line_ids.filtered('lot_id'):
+                vals_list.append({
+                    'lot_id': comp.lot_id.id,
+                    'product_id': comp.product_id.id,
+                    'ro_line_id': line.id,
+                    'component_id': comp.id,
+                    'date_from': line.start_date,
+                    'date_to': line.end_date,
+                })
+        return self.env['rental.lot.allocation']._allocate(vals_list)
+
+    def _release_rental_lots(self, release_date):
+        """End the lot allocations of hired-off lines on ``release_date``."""
+        self.env['rental.lot.allocation']._release(self, release_date)
+
     def _get_contract_line_vals(self):
         for rec in self:
             contract_line_vals =  {
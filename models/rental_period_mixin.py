@@ -0,0 +1,202 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+
+from dateutil.relativedelta import relativedelta
+
+from odoo import api, fields, models
+
+# Approximate length of every duration unit, in days.
+DURATION_UNIT_DAYS = {
+    'hour': 1.0 / 24,
+    'day': 1.0,
+    'week': 7.0,
+    'month': 30.0,
+}
+
+# relativedelta argument matching every duration unit.
+DURATION_UNIT_DELTA = {
+    'hour': 'hours',
+    'day': 'days',
+    'week': 'weeks',
+    'month': 'months',
+}
+
+
+class RentalPeriodMixin(models.AbstractModel):
+    _name = "rental.period.mixin"
+    _description = "Rental Period Mixin"
+
+    # One2many field holding the lines of a header document, False on lines.
+    _rental_line_field = False
+
+    duration = fields.Integer(string="Duration")
+    duration_unit = fields.Selection([
+        ('hour', 'Hours'),
+        ('day', 'Days'),
+        ('week', 'Weeks'),
+        ('month', 'Months'),
+    ], string="Unit")
+    duration_days = fields.Float(
+        string="Duration (Days)", compute="_compute_duration_days", store=True, index=True,
+        help="Duration normalized to days (a month counts as 30 days)."
+    )
+
+    @api.depends('duration', 'duration_unit')
+    def _compute_duration_days(self):
+        for record in self:
+            record.duration_days = self._convert_to_days(record.duration, record.duration_unit)
+
+    @api.depends('start_date', 'duration', 'duration_unit')
+    def _compute_end_date(self):
+        # Records sharing the same period compute their end date once and get
+        # it assigned together, so the flush writes them with one UPDATE.
+        record_ids = defaultdict(list)
+        for record in self:
+            record_ids[(record.start_date, record.duration, record.duration_unit)].append(record.id)
+        for (start_date, duration, duration_unit), ids in record_ids.items():
+            self.browse(ids).end_date = self._get_end_date(start_date, duration, duration_unit)
+
+    @api.model
+    def _get_end_date(self, start_date, duration, duration_unit):
+        """
+        Get the end date of a rental period.
+
+        Args:
+            start_date: first day of the period
+            duration: number of duration units
+            duration_unit: 'hour', 'day', 'week' or 'month'
+
+        Returns:
+            date: end date, False when the start date or the unit is missing
+        """
+        delta_unit = DURATION_UNIT_DELTA.get(duration_unit)
+        if not start_date or not delta_unit:
+            return False
+        # Date fields have no time, hours only count once they add up to full days.
+        return start_date + relativedelta(**{delta_unit: duration or 0})
+
+    @api.model
+    def _convert_to_days(self, duration, duration_unit):
+        """Convert any duration unit to approximate days for comparison"""
+        return (duration or 0) * DURATION_UNIT_DAYS.get(duration_unit, 0)
+
+    @api.depends(lambda self: (
+        (self._rental_line_field, self._rental_line_field + '.duration_days') if self._rental_line_field else ()
+    ))
+    def _compute_duration_from_lines(self):
+        """Compute header duration based on the longest line item duration."""
+        longest = self._get_longest_line_durations()
+        for record in self:
+            duration, duration_unit = longest.get(record.id, (False, False))
+            # Without lines, keep current values or defaults
+            record.duration = duration or record.duration or 1
+            record.duration_unit = duration_unit or record.duration_unit or 'month'
+
+    def _inverse_duration(self):
+        """Allow manual editing of header duration without affecting lines."""
+        pass
+
+    def _get_longest_line_durations(self):
+        """
+        Get the duration of the longest line of every header. Saved headers are
+        resolved with a single SQL query on the stored ``duration_days`` of
+        their lines; unsaved ones (onchange) from the lines in cache.
+
+        Returns:
+            dict: {header_id: (duration, duration_unit)}, headers without lines are omitted
+        """
+        if not self._rental_line_field:
+            return {}
+
+        line_field = self._fields[self._rental_line_field]
+        Line = self.env[line_field.comodel_name]
+        result = {}
+
+        saved = self.filtered(lambda record: isinstance(record.id, int))
+        if saved:
+            Line.flush([line_field.inverse_name, 'duration', 'duration_unit', 'duration_days'])
+            # table and column names come from the field definitions, only ids are parameters.
+            self._cr.execute(f"""
+                SELECT DISTINCT ON ({line_field.inverse_name}) {line_field.inverse_name}, duration, duration_unit
+                FROM {Line._table}
+                WHERE {line_field.inverse_name} IN %s AND duration_days > 0
+                ORDER BY {line_field.inverse_name}, duration_days DESC, id
+            """, (tuple(saved.ids), ))
+            result = {header_id: (duration, unit) for header_id, duration, unit in self._cr.fetchall()}
+
+        for record in self - saved:
+            lines = record[self._rental_line_field].filtered(lambda line: line.duration_days > 0)
+            if lines:
+                longest_line = max(lines, key=lambda line: line.duration_days)
+                result[record.id] = (longest_line.duration, longest_line.duration_unit)
+        return result
+
+
+class RentalPeriodOverlapMixin(models.AbstractModel):
+    _name = "rental.period.overlap.mixin"
+    _description = "Rental Period Overlap Mixin"
+
+    # Component model and its Many2one to the line, for set items.
+    _rental_component_model = False
+    _rental_component_field = False
+
+    def init(self):
+        super(RentalPeriodOverlapMixin, self).init()
+        if self._abstract:
+            return
+        # Stored rental period (half-open [start_date, end_date)) backed by a GiST
+        # index on (product_id, rental_period): overlap searches filter on both.
+        # btree_gist provides the GiST operator class of product_id.
+        self._cr.execute("CREATE EXTENSION IF NOT EXISTS btree_gist")
+        self._cr.execute(f"""
+            ALTER TABLE {self._table}
+            ADD COLUMN IF NOT EXISTS rental_period daterange
+            GENERATED ALWAYS AS (
+                CASE WHEN start_date IS NOT NULL AND end_date IS NOT NULL AND end_date >= start_date
+                     THEN daterange(start_date, end_date, '[)') END
+            ) STORED
+        """)
+        self._cr.execute(f"DROP INDEX IF EXISTS {self._table}_rental_period_idx")
+        self._cr.execute(f"""
+            CREATE INDEX IF NOT EXISTS {self._table}_product_rental_period_idx
+            ON {self._table} USING gist (product_id, rental_period)
+        """)
+
+    @api.model
+    def _search_overlapping(self, product_ids, date_from, date_to):
+        """
+        Find the lines renting any of the products during a period. Set items
+        match through their components.
+
+        Args:
+            product_ids: list of product ids
+            date_from: first day of the period
+            date_to: day after the last day of the period, False for an open-ended period
+
+        Returns:
+            recordset: Overlapping lines
+        """
+        if not product_ids:
+            return self.browse()
+
+        Component = self.env[self._rental_component_model]
+        self.flush(['product_id', 'start_date', 'end_date'])
+        Component.flush([self._rental_component_field, 'product_id'])
+        # table and column names come from the model definitions, only values are parameters.
+        self._cr.execute(f"""
+            SELECT line.id, line.start_date FROM {self._table} AS line
+            WHERE line.product_id IN %(product_ids)s AND
+                  line.rental_period && daterange(%(date_from)s, %(date_to)s, '[)')
+            UNION
+            SELECT line.id, line.start_date FROM {self._table} AS line
+            JOIN {Component._table} AS comp ON comp.{self._rental_component_field} = line.id
+            WHERE comp.product_id IN %(product_ids)s AND
+                  line.rental_period && daterange(%(date_from)s, %(date_to)s, '[)')
+            ORDER BY start_date, id
+        """, {
+            'product_ids': tuple(product_ids),
+            'date_from': date_from,
+            'date_to': date_to or None,
+        })
+        return self.browse([row[0] for row in self._cr.fetchall()])
@@ -1,17 +1,25 @@
 # -*- coding: utf-8 -*-
 
 import json
+import logging
 from datetime import datetime, timedelta
 
+import psycopg2
+
 from odoo import models, fields, api, _
 from odoo.exceptions import ValidationError, UserError
-from odoo.tools import float_is_zero, html_keep_url, is_html_empty
-from dateutil.relativedelta import relativedelta
+from odoo.tools import float_is_zero, html_keep_url, is_html_empty, split_every
+
+_logger = logging.getLogger(__name__)
+
+# Number of quotations converted per batched rental order creation.
+CONFIRM_BATCH_SIZE = 100
 
 
 class RentalQuotation(models.Model):
     _name = "rental.quotation"
-    _inherit = ["mail.thread", "mail.activity.mixin"]
+    _inherit = ["mail.thread", "mail.activity.mixin", "rental.period.mixin"]
+    _rental_line_field = "order_line"
     _description = "Rental Quotation"
     _order = 'date_order, id desc'
 
@@ -53,7 +61,7 @@ class RentalQuotation(models.Model):
     validity_date = fields.Date(string='Valid Until', readonly=True, copy=False, 
                                 states={'draft': [('readonly', False)], 'sent': [('readonly', False)]},
                                 default=_default_validity_date)
-    is_expired = fields.Boolean(compute='_compute_is_expired', string="Is expired")
+    is_expired = fields.Boolean(compute='_compute_is_expired', string="Is expired", store=True, index=True)
     create_date = fields.Datetime(string='Creation Date', 
                                   readonly=True, index=True, 
                                   help="Date on which quotation is created.")
@@ -147,37 +155,6 @@ class RentalQuotation(models.Model):
         ], limit=1)
     )
 
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                # For hours, we need to handle it differently as Date fields don't have hours
-                # This is a simplified approach - you might need to convert to datetime if precision is critical
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-
-    @api.model
-    def _convert_to_days(self, duration, duration_unit):
-        """Convert any duration unit to approximate days for comparison"""
-        if duration_unit == 'hour':
-            return duration / 24
-        elif duration_unit == 'day':
-            return duration
-        elif duration_unit == 'week':
-            return duration * 7
-        elif duration_unit == 'month':
-            return duration * 30  # Approximation
-        return 0
-    
     # @api.onchange('duration', 'duration_unit')
     # def _onchange_header_duration(self):
     #     """Update all line durations when header duration changes"""
@@ -186,42 +163,6 @@ class RentalQuotation(models.Model):
     #             line.duration = self.duration
     #             line.duration_unit = self.duration_unit
 
-    @api.depends("order_line", "order_line.duration", "order_line.duration_unit")
-    def _compute_duration_from_lines(self):
-        """Compute header duration based on the longest line item duration."""
-        for record in self:
-            if not record.order_line:
-                # No lines, keep current values or defaults
-                if not record.duration:
-                    record.duration = 1
-                if not record.duration_unit:
-                    record.duration_unit = 'month'
-                continue
-            
-            longest_days = 0
-            longest_duration = record.duration or 1
-            longest_unit = record.duration_unit or 'month'
-            
-            for line in record.order_line:
-                if not line.duration or not line.duration_unit:
-                    continue
-                line_days = record._convert_to_days(line.duration, line.duration_unit)
-                if line_days > longest_days:
-                    longest_days = line_days
-                    longest_duration = line.duration
-                    longest_unit = line.duration_unit
-            
-            # Only update if we found a longer duration
-            if longest_days > 0:
-                record.duration = longest_duration
-                record.duration_unit = longest_unit
-
-    def _inverse_duration(self):
-        """Allow manual editing of header duration without affecting lines."""
-        # This allows users to manually set header duration
-        # Lines maintain their own independent durations
-        pass
-
     @api.model
     def create(self, vals):
         if vals.get('name', _('New')) == _('New'):
@@ -232,17 +173,43 @@ class RentalQuotation(models.Model):
         result = super(RentalQuotation, self).create(vals)
         return result
 
+    def init(self):
+        # Sent quotations not flagged yet, the only rows the expiry cron can flip.
+        self._cr.execute("""
+            CREATE INDEX IF NOT EXISTS rental_quotation_sent_validity_date_idx
+            ON rental_quotation (validity_date) WHERE state = 'sent' AND is_expired IS NOT TRUE
+        """)
+
+    @api.depends('state', 'validity_date')
     def _compute_is_expired(self):
         today = fields.Date.today()
         for order in self:
-            order.is_expired = order.state == 'sent' and order.validity_date and order.validity_date < today
+            order.is_expired = bool(order.state == 'sent' and order.validity_date and order.validity_date < today)
+
+    @api.model
+    def _cron_flag_expired_quotations(self):
+        """
+        Flag the sent quotations whose validity date has passed. Changes of
+        state or validity date are handled by the compute, this only catches
+        up with the passing days in a single UPDATE.
+        """
+        self.flush(['state', 'validity_date', 'is_expired'])
+        self._cr.execute("""
+            UPDATE rental_quotation
+            SET is_expired = TRUE, write_uid = %(uid)s, write_date = NOW() AT TIME ZONE 'UTC'
+            WHERE state = 'sent' AND is_expired IS NOT TRUE AND validity_date < %(today)s
+        """, {'uid': self.env.uid, 'today': fields.Date.today()})
+        _logger.info(f"Flagged {self._cr.rowcount} rental quotations as expired")
+        self.invalidate_cache(['is_expired', 'write_uid', 'write_date'])
 
     @api.depends('order_line.tax_id', 'order_line.price_unit', 'amount_total', 'amount_untaxed')
     def _compute_tax_totals_json(self):
+        tax_memo = {}
+
         def compute_taxes(order_line):
             price = order_line.price_unit * (1 - (order_line.discount or 0.0) / 100.0)
             order = order_line.quotation_id
-            return order_line.tax_id._origin.compute_all(price, order.currency_id, order_line.product_uom_qty, product=order_line.product_id, partner=order.partner_shipping_id)
+            return order_line.tax_id._origin._rental_compute_all(tax_memo, price, order.currency_id, order_line.product_uom_qty, product=order_line.product_id, partner=order.partner_shipping_id)
 
         account_move = self.env['account.move']
         for order in self:
@@ -394,20 +361,91 @@ class RentalQuotation(models.Model):
 
         return orderline_vals
         
+    def _check_rental_order_requirements(self):
+        self.ensure_one()
+        if not self.customer_reference or not self.customer_po_number:
+            raise ValidationError(_("Please input Customer Reference and Customer Ref. PO !"))
+
+    def _create_rental_orders(self):
+        """
+        Convert the quotations into rental orders with a single batched create,
+        lines and components included as nested commands.
+
+        Returns:
+            gdi.rental.order: Created rental orders
+        """
+        order_vals_list = []
+        for rec in self:
+            order_vals = rec._prepare_rental_order()
+            order_vals['order_line'] = [(0, 0, rec._prepare_rental_order_line(line)) for line in rec.order_line]
+            order_vals_list.append(order_vals)
+        rental_orders = self.env['gdi.rental.order'].create(order_vals_list)
+        self.write({'state': 'confirm'})
+        return rental_orders
+
+    def _check_confirmable(self):
+        self.ensure_one()
+        if self.state != 'sent':
+            raise UserError(_("Only sent quotations can be confirmed."))
+        self._check_rental_order_requirements()
+
     def action_confirm(self):
+        if len(self) == 1:
+            self._check_confirmable()
+            rental_id = self._create_rental_orders()
+            return self.action_view_rental_orders(rental_id)
+
+        errors = []
+        confirmable = self.browse()
         for rec in self:
-            if not rec.customer_reference or not rec.customer_po_number:
-                raise ValidationError(_("Please input Customer Reference and Customer Ref. PO !"))            
-            order_vals = self._prepare_rental_order()
-            rental_id = self.env['gdi.rental.order'].create(order_vals)
-            for line in rec.order_line:
-                orderline_values = self._prepare_rental_order_line(line)
-                orderline_values.update({'order_id': rental_id.id})
-                rec.env['gdi.rental.order.line'].create(orderline_values)
-            
-            rec.write({'state': 'confirm'})
-            return rec.action_view_rental_orders(rental_id)
-            
+            try:
+                rec._check_confirmable()
+                confirmable |= rec
+            except UserError as e:
+                errors.append((rec, e))
+
+        rental_orders = self.env['gdi.rental.order']
+        for batch_ids in split_every(CONFIRM_BATCH_SIZE, confirmable.ids):
+            batch = self.browse(batch_ids)
+            try:
+                with self.env.cr.savepoint():
+                    rental_orders |= batch._create_rental_orders()
+            except (UserError, psycopg2.IntegrityError, psycopg2.DataError):
+                # Serialization failures and deadlocks propagate, the request is retried as a whole.
+                # retry one by one to find out which quotations are failing.
+                self.invalidate_cache()
+                for rec in batch:
+                    try:
+                        with self.env.cr.savepoint():
+                            rental_orders |= rec._create_rental_orders()
+                    except (UserError, psycopg2.IntegrityError, psycopg2.DataError) as e:
+                        self.invalidate_cache()
+                        errors.append((rec, e))
+
+        return self._action_confirm_notification(rental_orders, errors)
+
+    def _action_confirm_notification(self, rental_orders, errors):
+        message = _("%s rental order(s) created.") % len(rental_orders)
+        if errors:
+            message += "\n" + "\n".join(
+                "%s: %s" % (rec.name, error.args[0] if error.args else error) for rec, error in errors
+            )
+        params = {
+            'title': _("Quotation Confirmation"),
+            'message': message,
+            'type': 'warning' if errors else 'success',
+            'sticky': bool(errors),
+        }
+        if rental_orders:
+            action = self.env['ir.actions.actions']._for_xml_id("gdi_rental.action_gdi_rental_order")
+            action['domain'] = [('id', 'in', rental_orders.ids)]
+            params['next'] = action
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': params,
+        }
+
     def action_view_rental_orders(self, rental_id):
         action = self.env['ir.actions.actions']._for_xml_id("gdi_rental.action_gdi_rental_order")
         form_view = [(self.env.ref('gdi_rental.view_gdi_rental_order_form').id, 'form')]
@@ -6,11 +6,11 @@ from datetime import timedelta
 from odoo import api, fields, models, _
 from odoo.exceptions import UserError, ValidationError
 from odoo.tools.misc import get_lang
-from dateutil.relativedelta import relativedelta
 
 class RentalQuotationLine(models.Model):
     _name = 'rental.quotation.line'
     _description = 'Rental Quotation Line'
+    _inherit = ["rental.period.mixin"]
     _order = 'quotation_id, sequence, id'
 
     quotation_id = fields.Many2one('rental.quotation', string='RQ Reference', required=True,
@@ -59,22 +59,6 @@ class RentalQuotationLine(models.Model):
     )
     end_date = fields.Date(string="End Date", compute='_compute_end_date', store=True)
     
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-
     duration = fields.Integer(string="Duration", required=True)
     duration_unit = fields.Selection([
         ('hour', 'Hours'),
@@ -323,9 +307,10 @@ class RentalQuotationLine(models.Model):
         """
         Compute the amounts of the SO line.
         """
+        tax_memo = {}
         for line in self:
             price = line.price_unit * (1 - (line.discount or 0.0) / 100.0)
-            taxes = line.tax_id.compute_all(price, line.quotation_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.quotation_id.partner_shipping_id)
+            taxes = line.tax_id._rental_compute_all(tax_memo, price, line.quotation_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.quotation_id.partner_shipping_id)
             line.update({
                 'price_tax': sum(t.get('amount', 0.0) for t in taxes.get('taxes', [])),
                 'price_total': taxes['total_included'],
@@ -401,7 +386,7 @@ class RentalQuotationLine(models.Model):
         )
 
         if self.quotation_id.pricelist_id and self.quotation_id.partner_id:
-            rental_pricing_list = self._get_rental_pricing_list(product)
+            rental_pricing_list = product._get_rental_pricing_list()
             if not rental_pricing_list:
                 raise ValidationError(
                     "Rental price for the selected duration (%s) is not configured for this product. Please contact the administrator or choose different duration." % (self.duration_unit)
@@ -426,12 +411,6 @@ class RentalQuotationLine(models.Model):
 
         self.update(vals)
 
-    def _get_rental_pricing_list(self, product):
-        if not product or not product.rental_pricing_ids:
-            return False
-        
-        return {price.unit: price.price for price in product.rental_pricing_ids}
-    
     @api.onchange('component_line_ids')
     def onchange_component_line_ids(self):
         for rec in self:
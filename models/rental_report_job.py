@@ -0,0 +1,233 @@
+# -*- coding: utf-8 -*-
+import base64
+import logging
+import time
+from datetime import timedelta
+
+from odoo import api, fields, models, _
+from odoo.tools import html_escape
+from odoo.tools.safe_eval import safe_eval
+
+_logger = logging.getLogger(__name__)
+
+DEFAULT_REPORT_JOB_CONCURRENCY = 2
+DEFAULT_REPORT_ASYNC_THRESHOLD = 100
+
+# Running jobs not updated for that long are considered lost (killed worker).
+REPORT_JOB_TIMEOUT = timedelta(hours=1)
+
+# XML id of the first queue worker cron, the other workers are numbered copies of it.
+REPORT_JOB_CRON_XMLID = "ir_cron_rental_report_job"
+
+# Transaction level advisory lock serializing the claims of the queue workers.
+REPORT_JOB_CLAIM_LOCK = 7310246
+
+
+class RentalReportJob(models.Model):
+    _name = "rental.report.job"
+    _description = "Rental Report Job"
+    _order = "id desc"
+
+    name = fields.Char(string="Name", required=True, readonly=True)
+    report_id = fields.Many2one("ir.actions.report", string="Report", required=True, ondelete="cascade", readonly=True)
+    res_model = fields.Char(string="Model", required=True, readonly=True)
+    res_ids = fields.Char(string="Record Ids", required=True, readonly=True, help="Comma separated ids of the printed records.")
+    user_id = fields.Many2one("res.users", string="Requested By", required=True, readonly=True, default=lambda self: self.env.user)
+    state = fields.Selection([
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ], string="Status", default='pending', required=True, readonly=True, index=True)
+    attachment_id = fields.Many2one("ir.attachment", string="PDF", readonly=True, ondelete="set null")
+    error = fields.Text(string="Error", readonly=True)
+    date_done = fields.Datetime(string="Done On", readonly=True)
+
+    @api.model
+    def _get_param(self, key, default):
+        value = self.env['ir.config_parameter'].sudo().get_param(key)
+        try:
+            return int(value)
+        except (TypeError, ValueError):
+            return default
+
+    @api.model
+    def _get_async_threshold(self):
+        """Number of stock moves above which a rental report is rendered in background."""
+        return self._get_param('gdi_rental.report_async_threshold', DEFAULT_REPORT_ASYNC_THRESHOLD)
+
+    @api.model
+    def _enqueue(self, report, records):
+        """
+        Queue the rendering of a PDF report and wake up the queue workers.
+
+        Args:
+            report: ir.actions.report record
+            records: recordset to print
+
+        Returns:
+            dict: client action notifying the user that the report is being generated
+        """
+        name = report.name
+        if len(records) == 1 and report.print_report_name:
+            name = safe_eval(report.print_report_name, {'object': records, 'time': time})
+        # Jobs are only created and updated by the queue, users get read access.
+        job = self.sudo().create({
+            'name': name,
+            'report_id': report.id,
+            'res_model': records._name,
+            'res_ids': ','.join(str(res_id) for res_id in records.ids),
+        })
+        self._get_worker_crons().filtered('active')._trigger()
+        return {
+            'type': 'ir.actions.client',
+            'tag': 'display_notification',
+            'params': {
+                'title': _("Report queued"),
+                'message': _("%s is being generated, you will be notified when it is ready.") % job.name,
+                'sticky': False,
+            },
+        }
+
+    @api.model
+    def _get_worker_crons(self):
+        """
+        Every cron of the queue is a worker: the first one and its numbered
+        copies, archived ones included. Odoo never runs a cron twice at the
+        same time, so the number of reports rendered in parallel is bounded by
+        the number of active workers.
+
+        Returns:
+            ir.cron: Queue worker crons, ordered by creation
+        """
+        data = self.env['ir.model.data'].sudo().search([
+            ('module', '=', 'gdi_rental'),
+            ('model', '=', 'ir.cron'),
+            ('name', '=like', f"{REPORT_JOB_CRON_XMLID}%"),
+        ])
+        return self.env['ir.cron'].sudo().with_context(active_test=False).browse(data.mapped('res_id')).exists().sorted('id')
+
+    @api.model
+    def _sync_worker_crons(self):
+        """
+        Keep ``gdi_rental.report_job_concurrency`` active worker crons: the
+        missing ones are copied from the first worker, the extra ones are
+        archived.
+        """
+        main_cron = self.env.ref(f"gdi_rental.{REPORT_JOB_CRON_XMLID}", raise_if_not_found=False)
+        if not main_cron:
+            return
+        concurrency = max(self._get_param('gdi_rental.report_job_concurrency', DEFAULT_REPORT_JOB_CONCURRENCY), 1)
+        workers = self._get_worker_crons()
+        for number in range(len(workers) + 1, concurrency + 1):
+            worker = main_cron.sudo().copy({'name': _("%s (Worker %s)") % (main_cron.name, number)})
+            self.env['ir.model.data'].sudo().create({
+                'module': 'gdi_rental',
+                'model': 'ir.cron',
+                'name': f"{REPORT_JOB_CRON_XMLID}_{number}",
+                'res_id': worker.id,
+                'noupdate': True,
+            })
+            workers |= worker
+        workers[:concurrency].filtered(lambda cron: not cron.active).write({'active': True})
+        workers[concurrency:].filtered('active').write({'active': False})
+
+    @api.model
+    def _claim_job(self):
+        """
+        Flag the oldest pending job as running, unless
+        ``gdi_rental.report_job_concurrency`` jobs are already running (a
+        worker archived after a lower setting may still finish its job). The
+        count and the claim happen under an advisory lock, released by the
+        commit following the claim, so that two workers never both see a free
+        slot.
+
+        Returns:
+            rental.report.job: Claimed job, empty when none is available
+        """
+        concurrency = self._get_param('gdi_rental.report_job_concurrency', DEFAULT_REPORT_JOB_CONCURRENCY)
+        self.flush(['state'])
+        self._cr.execute("SELECT pg_advisory_xact_lock(%s)", (REPORT_JOB_CLAIM_LOCK,))
+        self._cr.execute("SELECT COUNT(*) FROM rental_report_job WHERE state = 'running'")
+        if self._cr.fetchone()[0] >= concurrency:
+            return self.browse()
+
+        self._cr.execute("""
+            SELECT id FROM rental_report_job
+            WHERE state = 'pending'
+            ORDER BY id
+            LIMIT 1
+            FOR UPDATE SKIP LOCKED
+        """)
+        row = self._cr.fetchone()
+        if not row:
+            return self.browse()
+        job = self.browse(row[0])
+        job.write({'state': 'running'})
+        return job
+
+    def _render(self):
+        """
+        Render the job's report as its requester and store it as an attachment.
+        The PDF of a single record printed by a report with ``attachment_use``
+        is already saved by the report itself, that attachment is reused.
+        """
+        self.ensure_one()
+        res_ids = [int(res_id) for res_id in self.res_ids.split(',') if res_id]
+        records = self.env[self.res_model].browse(res_ids).exists()
+        report = self.report_id.with_user(self.user_id).with_context(lang=self.user_id.lang)
+        pdf_content, dummy = report._render_qweb_pdf(records.ids)
+        attachment = self.env['ir.attachment']
+        if len(records) == 1 and report.attachment_use:
+            attachment = report._retrieve_attachment(records)
+        attachment = attachment or self.env['ir.attachment'].create({
+            'name': f"{self.name}.pdf",
+            'type': 'binary',
+            'datas': base64.b64encode(pdf_content),
+            'res_model': self.res_model,
+            'res_id': records[:1].id,
+            'mimetype': 'application/pdf',
+        })
+        self.write({'state': 'done', 'attachment_id': attachment.id, 'date_done': fields.Datetime.now()})
+        self._notify(_("%s is ready.") % html_escape(self.name), attachment)
+
+    def _notify(self, body, attachment=None):
+        self.ensure_one()
+        record = self.env[self.res_model].browse(int(self.res_ids.split(',')[0])).exists()
+        if record and hasattr(record, 'message_post'):
+            record.message_post(
+                body=body,
+                partner_ids=self.user_id.partner_id.ids,
+                attachment_ids=attachment.ids if attachment else [],
+            )
+
+    @api.model
+    def _cron_process_jobs(self, auto_commit=False):
+        """
+        Render the pending report jobs one after the other. Each queue cron
+        is one worker and there are ``gdi_rental.report_job_concurrency`` of
+        them, see ``_sync_worker_crons``, so that is the number of reports
+        rendered at the same time (hence of wkhtmltopdf processes).
+        """
+        # Jobs of killed workers never reach done, give them another try.
+        self.search([
+            ('state', '=', 'running'),
+            ('write_date', '<', fields.Datetime.now() - REPORT_JOB_TIMEOUT),
+        ]).write({'state': 'pending'})
+
+        while True:
+            job = self._claim_job()
+            if not job:
+                break
+            if auto_commit:
+                self.env.cr.commit()
+            try:
+                with self.env.cr.savepoint():
+                    job._render()
+            except Exception as e:
+                _logger.exception(f"Unable to render report job {job.name}")
+                self.invalidate_cache()
+                job.write({'state': 'failed', 'error': str(e)})
+                job._notify(_("%s could not be generated: %s") % (html_escape(job.name), html_escape(str(e))))
+            if auto_commit:
+                self.env.cr.commit()
@@ -0,0 +1,203 @@
+# -*- coding: utf-8 -*-
+
+import json
+from collections import defaultdict
+from datetime import timedelta
+
+from odoo import api, models
+
+
+class RentalStockAvailability(models.AbstractModel):
+    _name = "rental.stock.availability"
+    _description = "Rental Stock Availability Service"
+
+    @api.model
+    def _get_quant_qty_map(self, pairs):
+        """
+        Resolve the on-hand quantity of many (product, location) pairs at once.
+
+        Args:
+            pairs: iterable of (product_id, location_id) tuples
+
+        Returns:
+            dict: {(product_id, location_id): total_qty}, pairs without quants are omitted
+        """
+        pairs = {(product_id, location_id) for product_id, location_id in pairs if product_id and location_id}
+        if not pairs:
+            return {}
+
+        self.env['stock.quant'].flush(['product_id', 'location_id', 'quantity'])
+        quant_query = """
+            SELECT product_id, location_id, SUM(quantity) AS total_qty FROM stock_quant
+            WHERE (product_id, location_id) IN %s
+            GROUP BY product_id, location_id
+        """
+        self._cr.execute(quant_query, (tuple(pairs), ))
+        return {
+            (stock['product_id'], stock['location_id']): stock['total_qty'] or 0.0
+            for stock in self._cr.dictfetchall()
+        }
+
+    @api.model
+    def _fill_available_qty(self, records):
+        """
+        Compute ``available_qty`` of every record from a single grouped query.
+        Records must expose ``product_id`` and ``src_location_id``.
+        """
+        qty_map = self._get_quant_qty_map(
+            (rec.product_id.id, rec.src_location_id.id) for rec in records
+        )
+        for rec in records:
+            rec.available_qty = qty_map.get((rec.product_id.id, rec.src_location_id.id), 0.0)
+
+    @api.model
+    def _get_src_location_map(self, product_ids):
+        """
+        Resolve the internal locations holding stock for many products at once.
+
+        Args:
+            product_ids: iterable of product ids
+
+        Returns:
+            dict: {product_id: [{'location_id', 'location_name', 'qty'}, ...]}
+        """
+        product_ids = {product_id for product_id in product_ids if product_id}
+        if not product_ids:
+            return {}
+
+        self.env['stock.quant'].flush(['product_id', 'location_id', 'quantity'])
+        self.env['stock.location'].flush(['usage'])
+        quant_query = """
+            SELECT quant.product_id AS product_id, loc.id AS location_id, SUM(quant.quantity) AS total_qty
+            FROM stock_quant AS quant, stock_location AS loc
+            WHERE loc.usage = 'internal' AND
+                  quant.location_id = loc.id AND
+                  quant.quantity != 0.0 AND
+                  quant.product_id IN %s
+            GROUP BY quant.product_id, loc.id
+            ORDER BY quant.product_id, loc.id
+        """
+        self._cr.execute(quant_query, (tuple(product_ids), ))
+        results = self._cr.dictfetchall()
+
+        # Prefetch every location name in one go instead of browsing row by row.
+        location_ids = list({stock['location_id'] for stock in results})
+        location_names = dict(self.env['stock.location'].browse(location_ids).name_get())
+
+        location_map = {}
+        for stock in results:
+            location_map.setdefault(stock['product_id'], []).append({
+                'location_id': stock['location_id'],
+                'location_name': location_names.get(stock['location_id'], ''),
+                'qty': stock['total_qty'],
+            })
+        return location_map
+
+    @api.model
+    def _fill_available_src_location(self, records):
+        """
+        Compute the available source location fields of every record from a
+        single grouped query. Records must expose ``product_id``.
+        """
+        location_map = self._get_src_location_map(rec.product_id.id for rec in records)
+        Location = self.env['stock.location']
+        for rec in records:
+            if not rec.product_id:
+                rec.available_src_location_txt = '-'
+                rec.available_src_location_json = '[]'
+                rec.available_src_location_ids = False
+                continue
+
+            stocks = location_map.get(rec.product_id.id, [])
+            rec.available_src_location_json = json.dumps(stocks)
+            if stocks:
+                rec.available_src_location_txt = ''.join(
+                    '{} ({}) \n'.format(stock['location_name'], str(stock['qty'])) for stock in stocks
+                )
+                rec.available_src_location_ids = Location.browse([stock['location_id'] for stock in stocks])
+            else:
+                rec.available_src_location_txt = 'N/A'
+                rec.available_src_location_ids = False
+
+    @api.model
+    def _get_rented_out_qty_map(self, product_ids, warehouse):
+        """
+        Get the quantity of products delivered from a warehouse by rental
+        orders and not returned yet, i.e. the rental moves still pointed to as
+        the last delivery of a line or component without a later return.
+
+        Args:
+            product_ids: list of product ids
+            warehouse: stock.warehouse record
+
+        Returns:
+            dict: {product_id: qty out on rental}, products without rentals out are omitted
+        """
+        if not product_ids:
+            return {}
+
+        self.env['stock.move'].flush(['product_id', 'product_qty', 'state', 'date', 'location_id', 'rental_order_item_id'])
+        self.env['gdi.rental.order.line'].flush(['last_out_move_id', 'last_in_move_id'])
+        self.env['rental.order.component'].flush(['last_out_move_id', 'last_in_move_id'])
+        self._cr.execute("""
+            SELECT move.product_id, SUM(move.product_qty)::float
+            FROM stock_move AS move
+            JOIN stock_location AS loc ON loc.id = move.location_id
+            LEFT JOIN gdi_rental_order_line AS line ON line.last_out_move_id = move.id
+            LEFT JOIN rental_order_component AS comp ON comp.last_out_move_id = move.id
+            LEFT JOIN stock_move AS in_move ON in_move.id = COALESCE(comp.last_in_move_id, line.last_in_move_id)
+            WHERE move.product_id IN %s AND move.state = 'done' AND move.rental_order_item_id IS NOT NULL AND
+                  (line.id IS NOT NULL OR comp.id IS NOT NULL) AND
+                  loc.parent_path LIKE %s AND
+                  (in_move.id IS NULL OR in_move.date < move.date)
+            GROUP BY move.product_id
+        """, (tuple(product_ids), f"{warehouse.view_location_id.parent_path}%"))
+        return dict(self._cr.fetchall())
+
+    @api.model
+    def _fill_rental_free_qty(self, lines):
+        """
+        Compute ``rental_free_qty`` of rental order lines: the quantity owned by
+        their warehouse (on hand plus out on rental) minus the peak quantity
+        committed in the occupancy ledger over their rental period. One ledger
+        aggregate per warehouse and rental period, whatever the number of lines
+        and of overlapping rentals. The days a line committed itself are not
+        counted against it.
+        """
+        groups = defaultdict(lambda: lines.browse())
+        for line in lines:
+            groups[(line.warehouse_id, line.start_date, line.end_date)] |= line
+
+        Ledger = self.env['rental.occupancy.ledger']
+        for (warehouse, date_from, date_to), group in groups.items():
+            products = group.product_id
+            if not warehouse or not date_from or not products:
+                group.rental_free_qty = 0.0
+                continue
+
+            # The ledger period is half-open, a rental counts at least its first day.
+            if not date_to or date_to <= date_from:
+                date_to = date_from + timedelta(days=1)
+            exclusions = []
+            for index, line in enumerate(group):
+                if not line.product_id:
+                    continue
+                own_qty = 0.0
+                if line.occupancy_start_date and line.occupancy_end_date and \
+                        (line.occupancy_warehouse_id or line.warehouse_id) == warehouse:
+                    own_qty = sum(qty for product_id, qty in line._get_committed_occupancy_quantities()
+                                  if product_id == line.product_id.id)
+                exclusions.append((
+                    index, line.product_id.id,
+                    own_qty and line.occupancy_start_date, own_qty and line.occupancy_end_date, own_qty,
+                ))
+            committed_map = Ledger._get_committed_qty_excluding(exclusions, warehouse.id, date_from, date_to)
+            rented_out_map = self._get_rented_out_qty_map(products.ids, warehouse)
+            on_hand_map = {
+                product['id']: product['qty_available']
+                for product in products.with_context(warehouse=warehouse.id).read(['qty_available'])
+            }
+            for index, line in enumerate(group):
+                product_id = line.product_id.id
+                owned_qty = on_hand_map.get(product_id, 0.0) + rented_out_map.get(product_id, 0.0)
+                line.rental_free_qty = owned_qty - max(committed_map.get(index, 0.0), 0.0)
@@ -0,0 +1,93 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models
+
+
+class RentalUtilizationReport(models.Model):
+    _name = "rental.utilization.report"
+    _description = "Rental Utilization Report"
+    _auto = False
+    _order = "date desc, product_id, lot_id"
+
+    date = fields.Date(string="Month", readonly=True)
+    lot_id = fields.Many2one("stock.production.lot", string="Lot/Serial Number", readonly=True)
+    product_id = fields.Many2one("product.product", string="Product", readonly=True)
+    categ_id = fields.Many2one("product.category", string="Product Category", readonly=True)
+    company_id = fields.Many2one("res.company", string="Company", readonly=True)
+    days_available = fields.Integer(string="Days Available", readonly=True)
+    days_on_hire = fields.Integer(string="Days on Hire", readonly=True)
+    utilization = fields.Float(string="Utilization (%)", readonly=True, group_operator="avg")
+
+    def init(self):
+        # One row per rented lot and month, from the month the lot was created
+        # until the current month. The materialized view is only rebuilt by
+        # _refresh(), dashboards never recompute the rental history.
+        self._cr.execute("DROP MATERIALIZED VIEW IF EXISTS rental_utilization_report")
+        self._cr.execute("""
+            CREATE MATERIALIZED VIEW rental_utilization_report AS (
+                WITH lot_month AS (
+                    SELECT lot.id AS lot_id, lot.product_id, lot.company_id, month::date AS date,
+                           GREATEST(month::date, lot.create_date::date) AS date_from,
+                           LEAST((month + interval '1 month')::date, CURRENT_DATE + 1) AS date_to
+                    FROM stock_production_lot AS lot
+                    CROSS JOIN LATERAL generate_series(date_trunc('month', lot.create_date),
+                                                       date_trunc('month', CURRENT_DATE),
+                                                       interval '1 month') AS month
+                    WHERE EXISTS (SELECT 1 FROM rental_lot_ledger AS ledger WHERE ledger.lot_id = lot.id)
+                ), lot_usage AS (
+                    SELECT lot_month.lot_id, lot_month.date,
+                           SUM(GREATEST(
+                               LEAST(COALESCE(ledger.date_in::date, CURRENT_DATE + 1), lot_month.date_to)
+                               - GREATEST(ledger.date_out::date, lot_month.date_from), 0
+                           )) AS days_on_hire
+                    FROM lot_month
+                    JOIN rental_lot_ledger AS ledger ON ledger.lot_id = lot_month.lot_id AND
+                         ledger.date_out::date < lot_month.date_to AND
+                         COALESCE(ledger.date_in::date, 'infinity'::date) > lot_month.date_from
+                    GROUP BY lot_month.lot_id, lot_month.date
+                )
+                SELECT ROW_NUMBER() OVER (ORDER BY lot_month.lot_id, lot_month.date) AS id,
+                       lot_month.date,
+                       lot_month.lot_id,
+                       lot_month.product_id,
+                       tmpl.categ_id,
+                       lot_month.company_id,
+                       lot_month.date_to - lot_month.date_from AS days_available,
+                       LEAST(COALESCE(lot_usage.days_on_hire, 0), lot_month.date_to - lot_month.date_from) AS days_on_hire,
+                       CASE WHEN lot_month.date_to > lot_month.date_from
+                            THEN 100.0 * LEAST(COALESCE(lot_usage.days_on_hire, 0), lot_month.date_to - lot_month.date_from)
+                                 / (lot_month.date_to - lot_month.date_from)
+                            ELSE 0 END AS utilization
+                FROM lot_month
+                JOIN product_product AS product ON product.id = lot_month.product_id
+                JOIN product_template AS tmpl ON tmpl.id = product.product_tmpl_id
+                LEFT JOIN lot_usage ON lot_usage.lot_id = lot_month.lot_id AND lot_usage.date = lot_month.date
+                WHERE lot_month.date_to > lot_month.date_from
+            )
+        """)
+        # A unique index is required to refresh the view concurrently.
+        self._cr.execute("CREATE UNIQUE INDEX rental_utilization_report_id_idx ON rental_utilization_report (id)")
+        self._cr.execute("CREATE INDEX rental_utilization_report_date_idx ON rental_utilization_report (date, product_id)")
+
+    @api.model
+    def _refresh(self):
+        """Rebuild the report from the lot ledger without locking readers."""
+        self.env['rental.lot.ledger'].flush(['lot_id', 'date_out', 'date_in'])
+        self._cr.execute("REFRESH MATERIALIZED VIEW CONCURRENTLY rental_utilization_report")
+        self.invalidate_cache()
+
+    @api.model
+    def read_group(self, domain, fields, groupby, offset=0, limit=None, orderby=False, lazy=True):
+        # The utilization of a group is the ratio of its sums, not the average
+        # of the utilization of its rows.
+        fnames = [field.split(':')[0] for field in fields]
+        if 'utilization' in fnames:
+            fields = fields + [fname for fname in ('days_on_hire', 'days_available') if fname not in fnames]
+        result = super(RentalUtilizationReport, self).read_group(
+            domain, fields, groupby, offset=offset, limit=limit, orderby=orderby, lazy=lazy
+        )
+        if 'utilization' in fnames:
+            for group in result:
+                days_available = group.get('days_available')
+                group['utilization'] = 100.0 * (group.get('days_on_hire') or 0) / days_available if days_available else 0.0
+        return result
@@ -0,0 +1,95 @@
+# -*- coding: utf-8 -*-
+
+from odoo import api, fields, models, tools
+
+# Legacy operation type names, only used when nothing is configured on the warehouse.
+RENTAL_PICKING_TYPE_NAMES = {
+    'delivery': 'Rental Delivery Orders',
+    'inventory': 'Rental Physical Inventory',
+}
+
+
+class StockWarehouse(models.Model):
+    _inherit = "stock.warehouse"
+
+    rental_picking_type_id = fields.Many2one(
+        "stock.picking.type", string="Rental Delivery Type", check_company=True,
+        domain="[('code', '=', 'outgoing'), ('company_id', '=', company_id)]",
+        help="Operation type used for rental delivery orders. Defaults to the delivery type of the warehouse."
+    )
+    rental_inventory_type_id = fields.Many2one(
+        "stock.picking.type", string="Rental Physical Inventory Type", check_company=True,
+        domain="[('company_id', '=', company_id)]",
+        help="Operation type used for rental returns, hire-offs and extensions."
+    )
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super(StockWarehouse, self).create(vals_list)
+        self.clear_caches()
+        return res
+
+    def write(self, vals):
+        res = super(StockWarehouse, self).write(vals)
+        if {'rental_picking_type_id', 'rental_inventory_type_id', 'out_type_id', 'company_id', 'active'} & set(vals):
+            self.clear_caches()
+        return res
+
+    @api.model
+    def _get_rental_picking_type(self, kind, company=None, warehouse=None):
+        """
+        Resolve the operation type of a rental flow.
+
+        Args:
+            kind: 'delivery' or 'inventory'
+            company: res.company record, defaults to the current company
+            warehouse: stock.warehouse record, defaults to the first warehouse of the company
+
+        Returns:
+            stock.picking.type: Resolved operation type, empty when none is found
+        """
+        company = company or self.env.company
+        picking_type_id = self._get_rental_picking_type_id(kind, company.id, warehouse.id if warehouse else False)
+        return self.env['stock.picking.type'].browse(picking_type_id)
+
+    @api.model
+    @tools.ormcache('kind', 'company_id', 'warehouse_id')
+    def _get_rental_picking_type_id(self, kind, company_id, warehouse_id):
+        warehouse = self.sudo().browse(warehouse_id)
+        if not warehouse:
+            warehouse = self.sudo().search([('company_id', '=', company_id)], limit=1)
+
+        if kind == 'delivery':
+            picking_type = warehouse.rental_picking_type_id
+        else:
+            picking_type = warehouse.rental_inventory_type_id
+        if not picking_type:
+            # Operation types created before the warehouse configuration existed.
+            picking_type = self.env['stock.picking.type'].sudo().with_context(lang='en_US').search([
+                ('name', '=', RENTAL_PICKING_TYPE_NAMES[kind]),
+                ('company_id', '=', company_id),
+            ], order='sequence, id', limit=1)
+        if not picking_type and kind == 'delivery':
+            picking_type = warehouse.out_type_id
+        return picking_type.id or False
+
+
+class StockPickingType(models.Model):
+    _inherit = "stock.picking.type"
+
+    @api.model_create_multi
+    def create(self, vals_list):
+        res = super(StockPickingType, self).create(vals_list)
+        self.env['stock.warehouse'].clear_caches()
+        return res
+
+    def write(self, vals):
+        res = super(StockPickingType, self).write(vals)
+        if {'name', 'company_id', 'warehouse_id', 'active'} & set(vals):
+            self.env['stock.warehouse'].clear_caches()
+        return res
+
+    def unlink(self):
+        res = super(StockPickingType, self).unlink()
+        self.env['stock.warehouse'].clear_caches()
+        return res
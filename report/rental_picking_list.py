@@ -0,0 +1,120 @@
+# -*- coding: utf-8 -*-
+
+from collections import defaultdict
+
+from odoo import api, models
+
+# Product fields printed on the picking list.
+PRODUCT_FIELDS = ['name', 'default_code', 'item_code_ref', 'mysql_code', 'variant_mysql_code', 'product_name']
+
+
+class ReportRentalPickingList(models.AbstractModel):
+    _name = "report.gdi_rental.report_rental_picking_list"
+    _description = "Rental Picking List Report"
+
+    @api.model
+    def _get_report_values(self, docids, data=None):
+        docs = self.env['stock.picking'].browse(docids)
+        rental_items = {}
+        pickings_by_lang = defaultdict(lambda: self.env['stock.picking'])
+        for picking in docs:
+            pickings_by_lang[picking.partner_id.lang] |= picking
+        for lang, pickings in pickings_by_lang.items():
+            rental_items.update(self.with_context(lang=lang)._get_rental_items(pickings))
+        return {
+            'doc_ids': docids,
+            'doc_model': 'stock.picking',
+            'docs': docs,
+            'rental_items': rental_items,
+        }
+
+    @api.model
+    def _get_rental_items(self, pickings):
+        """
+        Read the rental items of the pickings with their moves, move lines,
+        products, lots, units of measure and locations. Every model is read
+        once whatever the number of items, the template only iterates the
+        returned structures.
+
+        Args:
+            pickings: stock.picking recordset
+
+        Returns:
+            dict: {picking_id: [{'name', 'is_unit', 'uom_name', 'qty', 'moves': [
+                      {'item_code_ref', 'mysql_code', 'variant_mysql_code', 'product_name', 'default_code',
+                       'location_name', 'qty', 'uom_name', 'lines': [
+                           {'item_code_ref', 'lot_name', 'qty', 'uom_name'}, ...]}, ...]}, ...]}
+        """
+        items = self.env['stock.rental.order.item'].search_read(
+            [('picking_id', 'in', pickings.ids)],
+            ['picking_id', 'name', 'product_id', 'product_uom', 'product_uom_qty', 'contract_line_id'],
+            order='id',
+        )
+        moves = self.env['stock.move'].search_read(
+            [('rental_order_item_id', 'in', [item['id'] for item in items])],
+            ['rental_order_item_id', 'product_id', 'location_id', 'product_qty', 'quantity_done', 'product_uom'],
+        )
+        move_lines = self.env['stock.move.line'].search_read(
+            [('move_id', 'in', [move['id'] for move in moves])],
+            ['move_id', 'product_id', 'lot_id', 'lot_name', 'product_qty', 'qty_done', 'product_uom_id'],
+        )
+
+        def ids_of(records, fname):
+            return {record[fname][0] for record in records if record[fname]}
+
+        products = {
+            product['id']: product for product in self.env['product.product'].browse(
+                ids_of(items, 'product_id') | ids_of(moves, 'product_id') | ids_of(move_lines, 'product_id')
+            ).read(PRODUCT_FIELDS)
+        }
+        uom_names = dict(self.env['uom.uom'].browse(
+            ids_of(items, 'product_uom') | ids_of(moves, 'product_uom') | ids_of(move_lines, 'product_uom_id')
+        ).name_get())
+        location_names = dict(self.env['stock.location'].browse(ids_of(moves, 'location_id')).name_get())
+        lot_names = dict(self.env['stock.production.lot'].browse(ids_of(move_lines, 'lot_id')).name_get())
+        item_types = {
+            line['id']: line['item_type']
+            for line in self.env['rental.contract.line'].browse(ids_of(items, 'contract_line_id')).read(['item_type'])
+        }
+
+        def product_of(record):
+            return products.get(record['product_id'] and record['product_id'][0], {})
+
+        def uom_name_of(record, fname):
+            return uom_names.get(record[fname] and record[fname][0], '')
+
+        lines_by_move = defaultdict(list)
+        for move_line in move_lines:
+            lines_by_move[move_line['move_id'][0]].append({
+                'item_code_ref': product_of(move_line).get('item_code_ref') or '',
+                'lot_name': lot_names.get(move_line['lot_id'] and move_line['lot_id'][0]) or move_line['lot_name'] or '-',
+                'qty': move_line['product_qty'] or move_line['qty_done'],
+                'uom_name': uom_name_of(move_line, 'product_uom_id'),
+            })
+
+        moves_by_item = defaultdict(list)
+        for move in moves:
+            product = product_of(move)
+            moves_by_item[move['rental_order_item_id'][0]].append({
+                'item_code_ref': product.get('item_code_ref') or '',
+                'mysql_code': product.get('mysql_code'),
+                'variant_mysql_code': product.get('variant_mysql_code'),
+                'product_name': product.get('product_name'),
+                'default_code': product.get('default_code') or '',
+                'location_name': location_names.get(move['location_id'] and move['location_id'][0], ''),
+                'qty': move['product_qty'] or move['quantity_done'],
+                'uom_name': uom_name_of(move, 'product_uom'),
+                'lines': lines_by_move[move['id']],
+            })
+
+        items_by_picking = defaultdict(list)
+        for item in items:
+            item_type = item_types.get(item['contract_line_id'] and item['contract_line_id'][0])
+            items_by_picking[item['picking_id'][0]].append({
+                'name': item['name'] or product_of(item).get('name'),
+                'is_unit': item_type == 'unit',
+                'uom_name': uom_name_of(item, 'product_uom'),
+                'qty': item['product_uom_qty'],
+                'moves': moves_by_item[item['id']],
+            })
+        return items_by_picking
@@ -0,0 +1,6 @@
+# -*- coding: utf-8 -*-
+
+from . import test_rental_stock_availability
+from . import test_rental_tax_memo
+from . import test_rental_period_benchmark
+from . import test_rental_occupancy_ledger
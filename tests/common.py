@@ -0,0 +1,58 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests.common import TransactionCase
+
+
+class RentalCommon(TransactionCase):
+
+    @classmethod
+    def setUpClass(cls):
+        super(RentalCommon, cls).setUpClass()
+        cls.partner = cls.env['res.partner'].create({'name': 'Rental Customer'})
+        cls.warehouse = cls.env['stock.warehouse'].search([('company_id', '=', cls.env.company.id)], limit=1)
+        cls.stock_location = cls.warehouse.lot_stock_id
+        cls.pricelist = cls.env['product.pricelist'].create({'name': 'Rental Pricelist'})
+        cls.tax = cls.env['account.tax'].create({
+            'name': 'Rental Tax 11%',
+            'amount_type': 'percent',
+            'amount': 11.0,
+            'type_tax_use': 'sale',
+        })
+        cls.product = cls.env['product.product'].create({
+            'name': 'Scaffolding Frame',
+            'type': 'product',
+        })
+        cls.env['stock.quant']._update_available_quantity(cls.product, cls.stock_location, 500.0)
+
+    @classmethod
+    def _create_rental_order(cls, line_count, order_vals=None, **line_vals):
+        """
+        Create a rental order of ``line_count`` identical lines.
+
+        Args:
+            line_count: number of order lines
+            order_vals: values overriding the default order values
+            line_vals: values overriding the default line values
+
+        Returns:
+            gdi.rental.order: Created order
+        """
+        vals = {
+            'name': cls.product.name,
+            'item_code': 'SCF',
+            'product_id': cls.product.id,
+            'product_uom_qty': 1.0,
+            'price_unit': 100.0,
+            'duration': 1,
+            'duration_unit': 'month',
+            'src_location_id': cls.stock_location.id,
+        }
+        vals.update(line_vals)
+        return cls.env['gdi.rental.order'].create(dict({
+            'partner_id': cls.partner.id,
+            'partner_invoice_id': cls.partner.id,
+            'partner_shipping_id': cls.partner.id,
+            'pricelist_id': cls.pricelist.id,
+            'warehouse_id': cls.warehouse.id,
+            'order_line': [(0, 0, dict(vals)) for dummy in range(line_count)],
+        }, **(order_vals or {})))
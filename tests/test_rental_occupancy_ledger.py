@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+from datetime import date
+
+from odoo.tests import tagged
+
+from .common import RentalCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRentalOccupancyLedger(RentalCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRentalOccupancyLedger, cls).setUpClass()
+        cls.started_line = cls._create_rental_order(1, {'start_date': date(2026, 1, 1)}, product_uom_qty=100.0).order_line
+        cls.env['rental.occupancy.ledger']._sync_lines(cls.started_line, {
+            cls.started_line.id: (cls.started_line.start_date, cls.started_line.end_date),
+        })
+
+    def _deliver(self, line, qty):
+        """Deliver ``qty`` of the line's product to the customer with a validated rental DO."""
+        customer_location = self.env.ref('stock.stock_location_customers')
+        picking = self.env['stock.picking'].create({
+            'partner_id': self.partner.id,
+            'picking_type_id': self.warehouse.out_type_id.id,
+            'location_id': self.stock_location.id,
+            'location_dest_id': customer_location.id,
+            'is_rental_do': True,
+        })
+        item = self.env['stock.rental.order.item'].create({
+            'picking_id': picking.id,
+            'name': line.name,
+            'item_code': line.item_code,
+            'product_id': line.product_id.id,
+            'product_uom_qty': qty,
+        })
+        move = self.env['stock.move'].create({
+            'name': line.name,
+            'picking_id': picking.id,
+            'rental_order_item_id': item.id,
+            'ro_line_id': line.id,
+            'product_id': line.product_id.id,
+            'product_uom_qty': qty,
+            'product_uom': line.product_id.uom_id.id,
+            'location_id': self.stock_location.id,
+            'location_dest_id': customer_location.id,
+        })
+        picking.action_confirm()
+        picking.action_assign()
+        move.quantity_done = qty
+        picking._action_done()
+        return picking
+
+    def test_committed_qty(self):
+        Ledger = self.env['rental.occupancy.ledger']
+        committed = Ledger._get_committed_qty(self.product.ids, self.warehouse.id, date(2026, 1, 15), date(2026, 3, 1))
+        self.assertEqual(committed, {self.product.id: 100.0})
+        committed = Ledger._get_committed_qty(self.product.ids, self.warehouse.id, date(2026, 2, 1), date(2026, 3, 1))
+        self.assertEqual(committed, {}, "The rental period ends on February 1st, excluded")
+
+    def test_release_committed_quantities(self):
+        """A line releases what it committed, even after its quantity changed."""
+        Ledger = self.env['rental.occupancy.ledger']
+        self.started_line.product_uom_qty = 40.0
+        self.started_line._release_occupancy(date(2026, 1, 10))
+
+        committed = Ledger._get_committed_qty(self.product.ids, self.warehouse.id, date(2026, 1, 1), date(2026, 1, 10))
+        self.assertEqual(committed, {self.product.id: 100.0})
+        committed = Ledger._get_committed_qty(self.product.ids, self.warehouse.id, date(2026, 1, 10), date(2026, 2, 1))
+        self.assertEqual(committed, {})
+
+        Ledger._sync_lines(self.started_line, {self.started_line.id: (False, False)})
+        self.assertFalse(Ledger.search([('product_id', '=', self.product.id)]))
+
+    def test_rental_free_qty(self):
+        overlapping_line = self._create_rental_order(1, {'start_date': date(2026, 1, 20)}).order_line
+        later_line = self._create_rental_order(1, {'start_date': date(2026, 2, 1)}).order_line
+
+        self.assertEqual(overlapping_line.rental_free_qty, 400.0)
+        self.assertEqual(later_line.rental_free_qty, 500.0)
+        self.assertEqual(self.started_line.rental_free_qty, 500.0, "A line does not compete with its own commitment")
+
+    def test_rental_free_qty_delivered(self):
+        """Items out on rental are owned stock, they only count once through the ledger."""
+        self._deliver(self.started_line, 100.0)
+        self.assertEqual(self.product.with_context(warehouse=self.warehouse.id).qty_available, 400.0)
+
+        overlapping_line = self._create_rental_order(1, {'start_date': date(2026, 1, 20)}).order_line
+        later_line = self._create_rental_order(1, {'start_date': date(2026, 2, 1)}).order_line
+
+        self.assertEqual(overlapping_line.rental_free_qty, 400.0)
+        self.assertEqual(later_line.rental_free_qty, 500.0)
+        self.assertEqual(self.started_line.rental_free_qty, 500.0)
+
+    def test_rental_free_qty_own_days(self):
+        """A line only leaves out its own quantity on the days it committed it."""
+        product = self.env['product.product'].create({'name': 'Shoring Prop', 'type': 'product'})
+        self.env['stock.quant']._update_available_quantity(product, self.stock_location, 500.0)
+        Ledger = self.env['rental.occupancy.ledger']
+
+        line = self._create_rental_order(1, {'start_date': date(2026, 1, 1)}, product_id=product.id, product_uom_qty=50.0).order_line
+        Ledger._sync_lines(line, {line.id: (date(2026, 1, 1), date(2026, 1, 10))})
+        other_line = self._create_rental_order(1, {'start_date': date(2026, 1, 15)}, product_id=product.id, product_uom_qty=100.0).order_line
+        Ledger._sync_lines(other_line, {other_line.id: (other_line.start_date, other_line.end_date)})
+
+        self.assertEqual(line.rental_free_qty, 400.0, "The other rental peaks at 100 on days the line did not commit")
@@ -0,0 +1,70 @@
+# -*- coding: utf-8 -*-
+import logging
+import time
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import RentalCommon
+
+_logger = logging.getLogger(__name__)
+
+BENCHMARK_LINE_COUNT = 50000
+
+
+@tagged('post_install', '-at_install', '-standard', 'rental_benchmark')
+class TestRentalPeriodBenchmark(RentalCommon):
+    """Run with ``--test-tags rental_benchmark``."""
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRentalPeriodBenchmark, cls).setUpClass()
+        order = cls._create_rental_order(0)
+        cls.env['gdi.rental.order.line'].create([{
+            'order_id': order.id,
+            'name': cls.product.name,
+            'item_code': 'SCF',
+            'product_id': cls.product.id,
+            'duration': index % 12 + 1,
+            'duration_unit': ('day', 'week', 'month')[index % 3],
+        } for index in range(BENCHMARK_LINE_COUNT)])
+        cls.lines = order.order_line
+
+    def _compute_end_date_per_record(self):
+        for line in self.lines:
+            line.end_date = line._get_end_date(line.start_date, line.duration, line.duration_unit)
+
+    def _run_compute(self, compute):
+        """
+        Run ``compute`` on fresh caches, writes included.
+
+        Returns:
+            tuple: (time in seconds, number of ``_get_end_date`` calls)
+        """
+        self.lines.invalidate_cache()
+        self.lines.mapped('start_date')
+        Line = type(self.env['gdi.rental.order.line'])
+        with patch.object(Line, '_get_end_date', autospec=True, side_effect=Line._get_end_date) as get_end_date:
+            start = time.perf_counter()
+            compute()
+            self.lines.flush(['end_date'])
+            duration = time.perf_counter() - start
+        return duration, get_end_date.call_count
+
+    def test_compute_end_date_benchmark(self):
+        per_record_time, per_record_calls = self._run_compute(self._compute_end_date_per_record)
+        expected = self.lines.mapped('end_date')
+        self.lines.invalidate_cache()
+        self.env.cr.execute("UPDATE gdi_rental_order_line SET end_date = NULL WHERE id IN %s", (tuple(self.lines.ids), ))
+        batched_time, batched_calls = self._run_compute(self.lines._compute_end_date)
+
+        self.lines.invalidate_cache()
+        self.assertEqual(self.lines.mapped('end_date'), expected)
+        self.assertEqual(per_record_calls, len(self.lines))
+        periods = {(line.start_date, line.duration, line.duration_unit) for line in self.lines}
+        self.assertEqual(batched_calls, len(periods), "One end date computation per distinct period")
+        # Timings depend on the machine load, they are only reported.
+        _logger.info(
+            f"End date of {len(self.lines)} lines computed in {batched_time:.3f}s batched "
+            f"({batched_calls} computations), {per_record_time:.3f}s per record ({per_record_calls} computations)"
+        )
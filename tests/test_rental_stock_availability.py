@@ -0,0 +1,36 @@
+# -*- coding: utf-8 -*-
+
+from odoo.tests import tagged
+
+from .common import RentalCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRentalStockAvailability(RentalCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRentalStockAvailability, cls).setUpClass()
+        cls.small_order = cls._create_rental_order(1)
+        cls.large_order = cls._create_rental_order(300)
+
+    def _read_available_qty(self, lines):
+        lines.invalidate_cache()
+        return lines.mapped('available_qty')
+
+    def test_available_qty_values(self):
+        self.assertEqual(self._read_available_qty(self.large_order.order_line), [500.0] * 300)
+
+        other_location = self.warehouse.view_location_id
+        self.small_order.order_line.src_location_id = other_location
+        self.assertEqual(self._read_available_qty(self.small_order.order_line), [0.0])
+
+    def test_available_qty_query_count(self):
+        """The lines are read once and the quants are summed once, whatever the number of lines."""
+        # Fill the access rights and model caches before counting.
+        self._read_available_qty(self.small_order.order_line)
+
+        with self.assertQueryCount(__system__=2):
+            self._read_available_qty(self.small_order.order_line)
+        with self.assertQueryCount(__system__=2):
+            self._read_available_qty(self.large_order.order_line)
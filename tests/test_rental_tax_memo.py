@@ -0,0 +1,49 @@
+# -*- coding: utf-8 -*-
+
+from unittest.mock import patch
+
+from odoo.tests import tagged
+
+from .common import RentalCommon
+
+
+@tagged('post_install', '-at_install')
+class TestRentalTaxMemo(RentalCommon):
+
+    @classmethod
+    def setUpClass(cls):
+        super(TestRentalTaxMemo, cls).setUpClass()
+        cls.order = cls._create_rental_order(300, tax_id=[(6, 0, cls.tax.ids)])
+        cls.order.order_line[:100].price_unit = 250.0
+
+    def _count_compute_all(self, func):
+        """Run ``func`` and count the ``compute_all`` calls it made."""
+        AccountTax = type(self.env['account.tax'])
+        with patch.object(AccountTax, 'compute_all', autospec=True, side_effect=AccountTax.compute_all) as compute_all:
+            result = func()
+        return compute_all.call_count, result
+
+    def _compute_without_memo(self):
+        amounts = []
+        for line in self.order.order_line:
+            taxes = line.tax_id.compute_all(
+                line.price_unit, line.order_id.currency_id, line.product_uom_qty,
+                product=line.product_id, partner=line.order_id.partner_shipping_id)
+            amounts.append((taxes['total_excluded'], taxes['total_included']))
+        return amounts
+
+    def _compute_with_memo(self):
+        lines = self.order.order_line
+        lines._compute_amount()
+        return [(line.price_subtotal, line.price_total) for line in lines]
+
+    def test_compute_amount_memo(self):
+        """Lines sharing the same taxes and price compute them once."""
+        calls_without_memo, amounts_without_memo = self._count_compute_all(self._compute_without_memo)
+        calls_with_memo, amounts_with_memo = self._count_compute_all(self._compute_with_memo)
+
+        self.assertEqual(calls_without_memo, 300)
+        self.assertEqual(calls_with_memo, 2, "One compute per distinct price")
+        self.assertEqual(amounts_with_memo, amounts_without_memo)
+        self.assertAlmostEqual(self.order.order_line[0].price_total, 277.5)
+        self.assertAlmostEqual(self.order.order_line[-1].price_total, 111.0)
@@ -1,4 +1,5 @@
 # -*- coding: utf-8 -*-
 
 from . import rental_contract_creation_wizard
-from . import rental_item_hireoff_wizard
\ No newline at end of file
+from . import rental_item_hireoff_wizard
+from . import rental_bulk_hireoff_wizard
\ No newline at end of file
@@ -0,0 +1,172 @@
+# -*- coding: utf-8 -*-
+
+import logging
+from collections import defaultdict
+
+from odoo import models, fields, api, _
+from odoo.exceptions import ValidationError
+
+_logger = logging.getLogger(__name__)
+
+class RentalBulkHireoffWizard(models.TransientModel):
+    _name = "rental.bulk.hireoff.wizard"
+    _description = "Rental Bulk Hire-Off Wizard"
+
+    @api.model
+    def default_get(self, fields_list):
+        res = super(RentalBulkHireoffWizard, self).default_get(fields_list)
+
+        active_model = self._context.get('active_model')
+        active_ids = self._context.get('active_ids') or []
+        if active_model == 'gdi.rental.order' and active_ids:
+            orders = self.env['gdi.rental.order'].browse(active_ids)
+            lines = orders.order_line
+        elif active_model == 'gdi.rental.order.line' and active_ids:
+            lines = self.env['gdi.rental.order.line'].browse(active_ids)
+        else:
+            return res
+
+        res['line_ids'] = [(6, 0, lines.filtered(lambda line: line.rental_state == 'active').ids)]
+        return res
+
+    line_ids = fields.Many2many(
+        "gdi.rental.order.line", string="Rental Items",
+        domain=[('rental_state', '=', 'active')]
+    )
+    dest_location_id = fields.Many2one(
+        "stock.location", string="Dest. Location", domain=[('usage', 'in', ['internal', 'inventory'])],
+        help="Location receiving the returned items. When empty, every item goes back to the location it was delivered from."
+    )
+    reason = fields.Text(string="Reason")
+
+    def action_confirm(self):
+        self.ensure_one()
+        pickings = self._process_hireoff()
+        return self._action_view_pickings(pickings)
+
+    def _process_hireoff(self):
+        """
+        Hire-off every selected active line. Returns are grouped by customer,
+        operation type and destination location (the location each line was
+        delivered from, unless one is forced) into as few pickings as
+        possible, all created and validated at once.
+
+        Returns:
+            stock.picking: Validated hire-off pickings
+        """
+        lines = self.line_ids.filtered(lambda line: line.rental_state == 'active')
+        if not lines:
+            raise ValidationError(_("No active rental items found to hire-off."))
+
+        # Moves return to the location of the move that delivered the line.
+        last_out_moves = {} if self.dest_location_id else lines._get_last_out_move_map()
+        groups = defaultdict(lambda: self.env['gdi.rental.order.line'])
+        for line in lines:
+            picking_type_id = line._get_rental_inventory_type()
+            if not picking_type_id:
+                raise ValidationError(
+                    _("Operation type 'Rental Physical Inventory' not found. "
+                    "Please contact your system administrator!")
+                )
+            dest_location = self.dest_location_id or last_out_moves.get(line.id, self.env['stock.move']).location_id
+            groups[(line.order_id.partner_id, picking_type_id, dest_location)] |= line
+
+        picking_vals_list = []
+        for (partner, picking_type_id, dest_location), group_lines in groups.items():
+            move_lines = group_lines._prepare_return_moves_vals(picking_type_id)
+            if not move_lines:
+                _logger.warning(f"No stock moves could be created for hire-off of {', '.join(group_lines.mapped('name'))}")
+                continue
+            if self.dest_location_id:
+                self._set_moves_dest_location(move_lines, self.dest_location_id)
+            picking_vals_list.append(self._prepare_hireoff_picking_vals(
+                partner, picking_type_id, dest_location, group_lines, move_lines
+            ))
+
+        if not picking_vals_list:
+            raise ValidationError(_("No stock moves could be created for hire-off."))
+
+        try:
+            pickings = self.env["stock.picking"].create(picking_vals_list)
+            pickings.button_validate()
+        except Exception as e:
+            _logger.error(f"Failed to create bulk hire-off physical inventory: {str(e)}")
+            raise ValidationError(
+                _("Failed to process hire-off. Error: %s") % str(e)
+            )
+
+        today = fields.Date.context_today(self)
+        lines.write({'rental_state': 'hireoff'})
+        lines._release_occupancy(today)
+        lines._release_rental_lots(today)
+
+        # Orders without any active item left are hired-off as a whole.
+        orders = lines.order_id
+        done_orders = orders.filtered(
+            lambda order: not order.order_line.filtered(lambda line: line.rental_state == 'active')
+        )
+        if done_orders:
+            done_orders.write({
+                'state': 'hireoff',
+                'hireoff_date': fields.Datetime.now(),
+            })
+
+        for order in orders:
+            order_pickings = pickings.filtered(lambda picking: order in picking.move_lines.ro_line_id.order_id)
+            body = _("Rental items hired-off. Physical inventory created: %s") % ", ".join(order_pickings.mapped('name'))
+            if self.reason:
+                body += "<br/>" + _("Reason: %s") % self.reason
+            order.message_post(body=body)
+
+        return pickings
+
+    def _set_moves_dest_location(self, move_lines, dest_location):
+        for _command, _id, move_vals in move_lines:
+            move_vals['location_dest_id'] = dest_location.id
+            for _line_command, _line_id, move_line_vals in move_vals.get('move_line_ids', []):
+                move_line_vals['location_dest_id'] = dest_location.id
+
+    def _prepare_hireoff_picking_vals(self, partner, picking_type_id, dest_location, lines, move_lines):
+        """
+        Prepare values for creating a grouped hire-off stock picking record.
+        
+        Args:
+            partner: res.partner record of the customer
+            picking_type_id: stock.picking.type record
+            dest_location: stock.location record receiving the items
+            lines: gdi.rental.order.line records returned by the picking
+            move_lines: list of move tuples to include
+            
+        Returns:
+            dict: Values for stock.picking creation
+        """
+        current_datetime = fields.Datetime.now()
+        orders = lines.order_id
+
+        picking_vals = {
+            'partner_id': partner.id,
+            'contact_person_id': partner.id,
+            'picking_type_id': picking_type_id.id,
+            'location_id': picking_type_id.default_location_dest_id.id,
+            'location_dest_id': dest_location.id,
+            'move_type': 'direct',
+            'scheduled_date': current_datetime,
+            'date_deadline': current_datetime,
+            'origin': f"{', '.join(orders.mapped('name'))} - Hire-off (IN)",
+            'customer_po': ', '.join(po for po in orders.mapped('customer_po_number') if po),
+            'src_user_id': self.env.user.id,
+            'move_ids_without_package': move_lines,
+            'rental_id': orders.id if len(orders) == 1 else False,
+        }
+        
+        return picking_vals
+
+    def _action_view_pickings(self, pickings):
+        action = self.env["ir.actions.actions"]._for_xml_id("stock.action_picking_tree_all")
+        if len(pickings) > 1:
+            action['domain'] = [('id', 'in', pickings.ids)]
+        elif pickings:
+            form_view = [(self.env.ref('stock.view_picking_form').id, 'form')]
+            action['views'] = form_view + [(state, view) for state, view in action.get('views', []) if view != 'form']
+            action['res_id'] = pickings.id
+        return action
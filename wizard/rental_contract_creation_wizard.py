@@ -1,12 +1,13 @@
 # -*- coding: utf-8 -*-
 
 from odoo import models, fields, api, _
-from dateutil.relativedelta import relativedelta
 from odoo.exceptions import ValidationError
 
 class RentalContractCreationWizard(models.TransientModel):
     _name = "rental.contract.creation.wizard"
     _description = "Rental Contract Creation Wizard"
+    _inherit = ["rental.period.mixin"]
+    _rental_line_field = "rental_contract_wizard_ids"
 
     @api.model
     def default_get(self, fields_list):
@@ -69,61 +70,6 @@ class RentalContractCreationWizard(models.TransientModel):
        help="Indicates whether the start and end dates are defined at the rental order level or at the rental order item level.")
     rental_contract_wizard_ids = fields.One2many("rental.contract.wizard.line", "contract_wiz_id", string="Items")
 
-    def _inverse_duration(self):
-        pass
-    
-    @api.depends("rental_contract_wizard_ids", "rental_contract_wizard_ids.duration", "rental_contract_wizard_ids.duration_unit")
-    def _compute_duration_from_lines(self):
-        for record in self:
-            record.update_header_duration()
-    
-    def update_header_duration(self):
-        longest_days = 0
-        longest_duration = self.duration
-        longest_unit = self.duration_unit
-
-        for line in self.rental_contract_wizard_ids:
-            line_days = self._convert_to_days(line.duration, line.duration_unit)
-            if line_days > longest_days:
-                longest_days = line_days
-                longest_duration = line.duration
-                longest_unit = line.duration_unit
-        
-        self.duration = longest_duration
-        self.duration_unit = longest_unit
-
-
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                # For hours, we need to handle it differently as Date fields don't have hours
-                # This is a simplified approach - you might need to convert to datetime if precision is critical
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
-
-    @api.model
-    def _convert_to_days(self, duration, duration_unit):
-        """Convert any duration unit to approximate days for comparison"""
-        if duration_unit == 'hour':
-            return duration / 24
-        elif duration_unit == 'day':
-            return duration
-        elif duration_unit == 'week':
-            return duration * 7
-        elif duration_unit == 'month':
-            return duration * 30  # Approximation
-        return 0
-
     def action_create_contract(self):
         for rec in self:
             rental_id = rec.rental_id
@@ -144,6 +90,18 @@ class RentalContractCreationWizard(models.TransientModel):
                         self._get_rental_contract_line_vals(line, contract_id)
                     )
 
+                # extend the committed occupancy of the items up to their new end date.
+                extended_lines = rec.rental_contract_wizard_ids.filtered('end_date')
+                self.env['rental.occupancy.ledger']._sync_lines(extended_lines.rental_order_line_id, {
+                    line.rental_order_line_id.id: (
+                        line.rental_order_line_id.occupancy_start_date or line.start_date,
+                        line.end_date
+                    ) for line in extended_lines
+                })
+                self.env['rental.lot.allocation']._extend({
+                    line.rental_order_line_id.id: line.end_date for line in extended_lines
+                })
+
                 return rental_id.action_view_rental_contract(contract_id)
             
     def _get_rental_contract_vals(self, rental_id=None):
@@ -208,15 +166,17 @@ class RentalContractCreationWizard(models.TransientModel):
 class RentalContractWizardLine(models.TransientModel):
     _name = "rental.contract.wizard.line"
     _description = "Rental Contract Wizard Line"
+    _inherit = ["rental.period.mixin"]
 
     @api.depends('product_uom_qty', 'price_unit')
     def _compute_amount(self):
         """
         Compute the amounts of the SO line.
         """
+        tax_memo = {}
         for line in self:
             price = line.price_unit * (1 - (0.0) / 100.0)
-            taxes = line.rental_order_line_id.tax_id.compute_all(price, line.contract_wiz_id.rental_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.contract_wiz_id.rental_id.partner_shipping_id)
+            taxes = line.rental_order_line_id.tax_id._rental_compute_all(tax_memo, price, line.contract_wiz_id.rental_id.currency_id, line.product_uom_qty, product=line.product_id, partner=line.contract_wiz_id.rental_id.partner_shipping_id)
             line.update({
                 'price_tax': sum(t.get('amount', 0.0) for t in taxes.get('taxes', [])),
                 'price_total': taxes['total_included'],
@@ -258,19 +218,3 @@ class RentalContractWizardLine(models.TransientModel):
         for rec in self:
             rec.duration_string = f"{rec.duration} {dict(self._fields['duration_unit'].selection).get(rec.duration_unit, 'Not Defined')}"
 
-
-    @api.depends('start_date', 'duration', 'duration_unit')
-    def _compute_end_date(self):
-        for record in self:
-            if not record.start_date:
-                record.end_date = False
-                continue
-                
-            if record.duration_unit == 'hour':
-                record.end_date = record.start_date + relativedelta(hours=record.duration)
-            elif record.duration_unit == 'day':
-                record.end_date = record.start_date + relativedelta(days=record.duration)
-            elif record.duration_unit == 'week':
-                record.end_date = record.start_date + relativedelta(weeks=record.duration)
-            elif record.duration_unit == 'month':
-                record.end_date = record.start_date + relativedelta(months=record.duration)
\ No newline at end of file
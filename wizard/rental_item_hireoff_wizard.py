@@ -15,12 +15,12 @@ class RentalItemHireoffWizard(models.TransientModel):
     def default_get(self, fields_list):
         res = super(RentalItemHireoffWizard, self).default_get(fields_list)
 
-        picking_type_id = self.env["stock.picking.type"].search([('name', '=', 'Rental Physical Inventory')], limit=1)
         if self._context.get('default_rental_orderline_id', False):
             rental_orderline_id = self.env["gdi.rental.order.line"].browse(self._context.get("default_rental_orderline_id"))
             if not rental_orderline_id:
                 raise ValidationError(_("The rental order line you are trying to open no longer exists."))
             
+            picking_type_id = rental_orderline_id._get_rental_inventory_type()
             res.update({
                 'rental_orderline_id': rental_orderline_id.id,
                 'picking_type_id': picking_type_id.id,
@@ -35,7 +35,7 @@ class RentalItemHireoffWizard(models.TransientModel):
     reason = fields.Text(string="Reason", required=True)
 
     def action_confirm(self):
-        picking_type_id = self.env["stock.picking.type"].search([("name", "=", "Rental Physical Inventory")])
+        picking_type_id = self.picking_type_id or self.rental_orderline_id._get_rental_inventory_type()
         if not picking_type_id:
             raise ValidationError(_("Operation type to perform rental hire-off not found. Please contact your system administrator !"))
         
@@ -44,6 +44,8 @@ class RentalItemHireoffWizard(models.TransientModel):
         self.rental_orderline_id.write({
             'rental_state': 'hireoff' 
         })
+        self.rental_orderline_id._release_occupancy(fields.Date.context_today(self))
+        self.rental_orderline_id._release_rental_lots(fields.Date.context_today(self))
 
         return self._action_view_pi(physical_inventory) 
     
@@ -124,277 +126,8 @@ class RentalItemHireoffWizard(models.TransientModel):
         Returns:
             list: List of tuples for creating stock moves
         """
-        current_datetime = fields.Datetime.now()
-        move_lines = []
-        sq_no = 0
-        
-        for line in self.rental_orderline_id:
-            sq_no += 1
-            
-            prev_picking = self._get_hireoff_previous_picking(line)
-            if not prev_picking:
-                _logger.warning(f"No previous picking found for hire-off line: {line.name}")
-                continue
-            
-            if line.item_type == 'set' and line.component_line_ids:
-                # Handle set items with components
-                component_moves = self._prepare_hireoff_set_component_moves(
-                    line, picking_type_id, prev_picking,
-                    sq_no, current_datetime
-                )
-                move_lines.extend(component_moves)
-            else:
-                # Handle regular unit items
-                move_data = self._prepare_hireoff_stock_move(
-                    line, picking_type_id, prev_picking,
-                    sq_no, current_datetime
-                )
-                if move_data:
-                    move_lines.append(move_data)
-        
-        return move_lines
-
-
-    def _get_hireoff_previous_picking(self, line):
-        """
-        Get the previous picking/move for a hire-off line.
-        
-        Args:
-            line: rental order line record
-            
-        Returns:
-            stock.move: Previous stock move or False
-        """
-        if not line.stock_move_ids:
-            return False
-        
-        # Get the last move (most recent)
-        moves = line.stock_move_ids
-        return moves[-1] if moves else False
-
-
-    def _prepare_hireoff_set_component_moves(self, line, picking_type_id,
-                                            prev_picking, sequence, current_datetime):
-        """
-        Prepare hire-off move data for all components in a set.
-        
-        Args:
-            line: rental order line record (set item)
-            picking_type_id: stock.picking.type record
-            prev_picking: previous stock.move record
-            sequence: base sequence number for the set
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating component moves
-        """
-        component_moves = []
-        component_seq = 0
-        
-        for component in line.component_line_ids:
-            component_seq += 1
-            
-            prev_component_move = self._find_hireoff_component_previous_move(
-                component, prev_picking
-            )
-            
-            if not prev_component_move:
-                _logger.warning(
-                    f"No previous move found for component {component.product_id.name} "
-                    f"in set {line.name}"
-                )
-                continue
-            
-            move_data = self._prepare_hireoff_component_move(
-                line, component, picking_type_id,
-                prev_component_move, sequence, component_seq, current_datetime
-            )
-            
-            if move_data:
-                component_moves.append(move_data)
-        
-        return component_moves
-
-
-    def _find_hireoff_component_previous_move(self, component, prev_picking):
-        """
-        Find the previous stock move for a specific component.
-        
-        Args:
-            component: component line record
-            prev_picking: previous stock.move or stock.picking record
-            
-        Returns:
-            stock.move: Previous move for this component or False
-        """
-        # If prev_picking is a stock.move, get its picking
-        if prev_picking._name == 'stock.move':
-            picking = prev_picking.picking_id
-        else:
-            picking = prev_picking
-        
-        if not picking:
-            return False
-        
-        # Search for move with matching product
-        component_move = picking.move_lines.filtered(
-            lambda m: m.product_id.id == component.product_id.id
-        )
-        
-        return component_move[0] if component_move else False
-
-
-    def _prepare_hireoff_component_move(self, set_line, component,
-                                        picking_type_id, prev_component_move,
-                                        set_sequence, component_sequence, current_datetime):
-        """
-        Prepare hire-off stock move data for a single set component.
-        
-        Args:
-            set_line: rental order line record (parent set)
-            component: component line record
-            picking_type_id: stock.picking.type record
-            prev_component_move: previous stock.move for this component
-            set_sequence: sequence number of the parent set
-            component_sequence: sequence number within components
-            current_datetime: current datetime
-            
-        Returns:
-            tuple: Move data tuple (0, 0, dict) for creation
-        """
-        # Prepare move lines with lot tracking for the component
-        move_line_vals = self._prepare_hireoff_component_move_lines(
-            component, prev_component_move, picking_type_id, current_datetime
-        )
-        
-        # Use component details for the move
-        product = component.product_id
-        name = product.product_name or product.name or component.name
-        
-        # Prepare main move values
-        move_vals = {
-            'sequence_number': set_sequence + (component_sequence * 0.01),  # e.g., 1.01, 1.02
-            'name': f"{set_line.name} - {name}",
-            'description_picking': name,
-            'product_id': product.id,
-            'product_uom': component.product_uom.id,
-            'product_uom_qty': component.product_uom_qty,
-            'date': current_datetime,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': prev_component_move.location_id.id,
-            'move_line_ids': move_line_vals,
-        }
-        
-        return (0, 0, move_vals)
-
-
-    def _prepare_hireoff_component_move_lines(self, component, prev_component_move,
-                                            picking_type_id, current_datetime):
-        """
-        Prepare detailed move lines for component hire-off with lot/serial tracking.
-        
-        Args:
-            component: component line record
-            prev_component_move: previous stock.move record for this component
-            picking_type_id: stock.picking.type record
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating stock.move.line records
-        """
-        move_lines = []
-        
-        if not prev_component_move.move_line_ids:
-            return move_lines
-        
-        for moveline in prev_component_move.move_line_ids:
-            move_line_vals = {
-                'product_id': component.product_id.id,
-                'product_uom_id': component.product_uom.id,
-                'product_uom_qty': moveline.qty_done,
-                'qty_done': moveline.qty_done,
-                'date': current_datetime,
-                'location_id': picking_type_id.default_location_dest_id.id,
-                'location_dest_id': prev_component_move.location_id.id,
-                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
-            }
-            move_lines.append((0, 0, move_line_vals))
-        
-        return move_lines
-
+        return self.rental_orderline_id._prepare_return_moves_vals(picking_type_id)
 
-    def _prepare_hireoff_stock_move(self, line, picking_type_id,
-                                    prev_picking, sequence, current_datetime):
-        """
-        Prepare hire-off stock move data with detailed move lines.
-        (For non-set items)
-        
-        Args:
-            line: rental order line record
-            picking_type_id: stock.picking.type record
-            prev_picking: previous stock.move record
-            sequence: sequence number for the move
-            current_datetime: current datetime
-            
-        Returns:
-            tuple: Move data tuple (0, 0, dict) for creation
-        """
-        # Prepare move lines with lot tracking
-        move_line_vals = self._prepare_hireoff_move_lines(
-            line, prev_picking, picking_type_id, current_datetime
-        )
-        
-        # Prepare main move values
-        move_vals = {
-            'sequence_number': sequence,
-            'name': line.name,
-            'description_picking': line.name,
-            'product_id': line.product_id.id,
-            'product_uom': line.product_uom.id,
-            'product_uom_qty': line.product_uom_qty,
-            'date': current_datetime,
-            'location_id': picking_type_id.default_location_dest_id.id,
-            'location_dest_id': prev_picking.location_id.id,
-            'move_line_ids': move_line_vals,
-        }
-        
-        return (0, 0, move_vals)
-
-
-    def _prepare_hireoff_move_lines(self, line, prev_picking, picking_type_id, current_datetime):
-        """
-        Prepare detailed move lines with lot/serial tracking from previous picking.
-        (For non-set items)
-        
-        Args:
-            line: rental order line record
-            prev_picking: previous stock.move record
-            picking_type_id: stock.picking.type record
-            current_datetime: current datetime
-            
-        Returns:
-            list: List of tuples for creating stock.move.line records
-        """
-        move_lines = []
-        
-        if not prev_picking.move_line_ids:
-            return move_lines
-        
-        for moveline in prev_picking.move_line_ids:
-            move_line_vals = {
-                'product_id': line.product_id.id,
-                'product_uom_id': line.product_uom.id,
-                'product_uom_qty': moveline.qty_done,
-                'qty_done': moveline.qty_done,
-                'date': current_datetime,
-                'location_id': picking_type_id.default_location_dest_id.id,
-                'location_dest_id': prev_picking.location_id.id,
-                'lot_id': moveline.lot_id.id if moveline.lot_id else False,
-            }
-            move_lines.append((0, 0, move_line_vals))
-        
-        return move_lines
-                    
         
     def _action_view_pi(self, pickings):
         self.ensure_one()